@@ -1,10 +1,56 @@
 import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
 import pandas as pd
 import seaborn as sns
-from collections import Counter
 import numpy as np
 import sys
-import os
+import colorsys
+import json
+import re
+import argparse
+from functools import partial, reduce
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as pa_feather
+except ImportError:  # pyarrow is optional; Arrow input and output are then unavailable
+    pa = None
+
+from shoe_readers import (
+    SHOE_FIELDS, VALID_USAGES, TEXT_FIELDS, DEFAULT_BATCH_SIZE, Shoe, ParseDiagnostics, canonicalize, load_aliases,
+    open_shoe_source, iter_shoe_records, iter_shoe_batches, read_shoe_dataframe_from_stream, read_shoe_columns_mmap,
+    read_shoe_data_batch, read_shoe_columns_cached, read_shoe_data_incrementally, encode_shoe_columns, create_dataframe,
+    _expand_shoe_sources, _parse_shoe_source, _run_shoe_batch, _sorted_categorical,
+)
+
+# Columns each output of analyze_shoes needs, so loading can skip the others
+PANEL_COLUMNS = {
+    'colors': ['color'],
+    'usage': ['usage'],
+    'sizes': ['size'],
+    'brands': ['brand'],
+    'brand_usage': ['brand', 'usage'],
+    'size_by_color': ['color', 'size'],
+    'inventory': SHOE_FIELDS,  # The inventory table figure
+}
+CHART_PANELS = [panel for panel in PANEL_COLUMNS if panel != 'inventory']
+
+# Fixed-point size encoding used for size histograms and quantiles
+SIZE_STEPS_PER_UNIT = 2  # Sizes are counted in half sizes
+INVALID_SIZE_CODE = -1  # Encoded size of an invalid size, which the readers default to 0
+MAX_SIZE_CODE = np.iinfo(np.int16).max
+SUMMARY_FORMAT_VERSION = 1  # Bump whenever the saved collection summary layout changes
+KDE_FFT_MIN_ROWS = 100_000  # Shoes above which the size histogram's KDE is computed by binned_kde
+KDE_FFT_GRID_SIZE = 2048  # Bins the binned KDE spreads the data over before convolving
+KDE_KERNEL_REACH = 5  # Bandwidths beyond which the Gaussian kernel is treated as zero
+CUBE_FIELDS = ['brand', 'color', 'usage', 'size']  # Dimensions of a ShoeCube; the free-text name is left out
+CUBE_DENSE_MAX_CELLS = 10_000_000  # Largest cube stored as a dense array
+BITMAP_MAX_VALUES = 256  # Fields with at most this many values get a packed bitmap per value in a ShoeIndex
+FILTER_TOKEN = re.compile(r'''\s*(?:(?P<string>"[^"]*"|'[^']*')|(?P<op>==|!=|<=|>=|=|<|>)|(?P<punct>[(){},])|(?P<word>[^\s(){},=!<>"']+))''')
+BOXPLOT_MAX_FLIERS = 20  # Most extreme distinct sizes drawn as fliers on each side of a box
+SHARED_MEMORY_ALIGNMENT = 64  # Byte alignment of each column in a shared-memory segment
 
 def get_shoe_data():
     """Collects shoe data from user input."""
@@ -15,12 +61,12 @@ def get_shoe_data():
         
         for i in range(1, num_shoes + 1):
             print(f"\nShoe #{i}")
-            brand = input("Brand: ").strip().capitalize()
-            name = input("Name/Model: ").strip().capitalize()
-            color = input("Color: ").strip().capitalize()
+            brand = canonicalize('brand', input("Brand: "))
+            name = canonicalize('name', input("Name/Model: "))
+            color = canonicalize('color', input("Color: "))
             while True:
-                usage = input("Usage (Casual, Athletic, Formal): ").strip().capitalize()
-                if usage in ["Casual", "Athletic", "Formal"]:
+                usage = canonicalize('usage', input("Usage (Casual, Athletic, Formal): "))
+                if usage in VALID_USAGES:
                     break
                 else:
                     print("Invalid usage. Please choose from: Casual, Athletic, Formal.")
@@ -32,13 +78,7 @@ def get_shoe_data():
                 print("Invalid size input. Using 0 as default.")
                 size = 0
             
-            shoes.append({
-                'brand': brand,
-                'name': name,
-                'color': color,
-                'usage': usage,
-                'size': size
-            })
+            shoes.append(Shoe(brand, name, color, usage, size))
         
         return shoes
     
@@ -46,55 +86,57 @@ def get_shoe_data():
         print("Please enter a valid number of shoes.")
         return get_shoe_data()
 
-def read_shoe_data_from_file(filename):
-    """Reads shoe data from a text file."""
-    shoes = []
+def _summarize_shoe_source(path, rejects_path=None, aliases=None, brand_capacity=None):
+    """Parses one file of a batch and summarizes it, returning (path, CollectionSummary, ParseDiagnostics, error message)."""
+    path, df, diagnostics, error = _parse_shoe_source(path, rejects_path, aliases)
+    return path, None if df is None else CollectionSummary.from_table(df, brand_capacity), diagnostics, error
+
+def summarize_shoe_batch(pattern, workers=None, brand_capacity=None, diagnostics=None):
+    """Summarizes many shoe data files in a process pool, without combining their inventories.
     
-    try:
-        with open(filename, 'r') as file:
-            lines = file.readlines()
-            
-            # Skip header line
-            for line in lines[1:]:
-                if line.strip() and not line.strip().startswith('#'):  # Skip empty lines and comments
-                    parts = line.strip().split(',')
-                    if len(parts) >= 5:  # Ensure we have all fields: brand, name, color, usage, size
-                        brand = parts[0].strip().capitalize()
-                        name = parts[1].strip().capitalize()
-                        color = parts[2].strip().capitalize()
-                        usage = parts[3].strip().capitalize()
-                        
-                        # Validate usage
-                        if usage not in ["Casual", "Athletic", "Formal"]:
-                            print(f"Warning: Invalid usage '{usage}' found in file. Defaulting to 'Casual'.")
-                            usage = "Casual"
-                        
-                        try:
-                            size = float(parts[4].strip())
-                        except ValueError:
-                            print(f"Warning: Invalid size '{parts[4].strip()}' found in file. Using 0 as default.")
-                            size = 0
-                        
-                        shoes.append({
-                            'brand': brand,
-                            'name': name,
-                            'color': color,
-                            'usage': usage,
-                            'size': size
-                        })
-            
-            if not shoes:
-                print("No valid data found in the file.")
-                return None
-            
-            return shoes
+    Each worker parses one file and returns only its CollectionSummary; the
+    partial summaries are merged once all files are read. Files that cannot
+    be read are reported and skipped, as in read_shoe_data_batch.
     
-    except FileNotFoundError:
-        print(f"File '{filename}' not found.")
+    Args:
+        pattern: A directory (all files in it are read) or a glob pattern
+        workers: Number of worker processes (defaults to the number of CPUs)
+        brand_capacity: Optional number of brands to track approximately
+            (see CollectionSummary.from_table)
+        diagnostics: Optional ParseDiagnostics collecting validation problems
+    
+    Returns:
+        The merged CollectionSummary, or None if no file had valid data
+    """
+    paths = _expand_shoe_sources(pattern)
+    if not paths:
+        print(f"No files found for '{pattern}'.")
         return None
-    except Exception as e:
-        print(f"An error occurred while reading the file: {e}")
+    
+    diagnostics = diagnostics if diagnostics is not None else ParseDiagnostics()
+    results = _run_shoe_batch(paths, partial(_summarize_shoe_source, brand_capacity=brand_capacity), workers, diagnostics)
+    diagnostics.report(f"'{pattern}'")
+    if not results:
+        print("No valid data found in the batch.")
         return None
+    return merge_summaries(results[path] for path in paths if path in results)
+
+def summarize_shoe_stream(stream, batch_size=DEFAULT_BATCH_SIZE, brand_capacity=None, diagnostics=None):
+    """Summarizes shoe data from an open text stream without keeping the inventory.
+    
+    Each batch of records is summarized and merged into the running
+    summary, so memory is bounded by one batch plus the summary; with
+    brand_capacity the summary itself stays bounded however many brands
+    the stream holds.
+    
+    Returns:
+        The CollectionSummary, or None if the stream had no valid records
+    """
+    summary = None
+    for batch in iter_shoe_batches(iter_shoe_records(stream, diagnostics=diagnostics), batch_size):
+        part = CollectionSummary.from_table(create_dataframe(batch), brand_capacity=brand_capacity)
+        summary = part if summary is None else summary.merge(part)
+    return summary
 
 def create_template_file(filename="shoe_data_template.txt"):
     """Creates a template file for shoe data."""
@@ -114,20 +156,1350 @@ def create_template_file(filename="shoe_data_template.txt"):
     except Exception as e:
         print(f"An error occurred while creating the template file: {e}")
 
-def create_dataframe(shoes):
-    """Converts shoe data list to pandas DataFrame."""
-    return pd.DataFrame(shoes)
+def encode_sizes(sizes):
+    """Encodes shoe sizes as int16 counts of half sizes.
+    
+    Sizes off the half-size grid are rounded to the nearest half size. The
+    readers' default of 0 for an invalid size, and anything negative, NaN or
+    too large to encode, becomes INVALID_SIZE_CODE.
+    """
+    steps = np.rint(np.asarray(sizes, dtype=np.float64) * SIZE_STEPS_PER_UNIT)
+    valid = (steps > 0) & (steps <= MAX_SIZE_CODE)  # False for NaN as well
+    return np.where(valid, steps, INVALID_SIZE_CODE).astype(np.int16)
+
+def decode_sizes(codes):
+    """Turns size codes back into float32 sizes, with invalid sizes as 0."""
+    codes = np.asarray(codes)
+    return np.where(codes == INVALID_SIZE_CODE, 0, codes).astype(np.float32) / np.float32(SIZE_STEPS_PER_UNIT)
+
+def save_shoe_arrow(data, filename):
+    """Saves shoe data as an uncompressed Arrow IPC file (Feather v2), which readers can memory-map.
+    
+    Args:
+        data: DataFrame, ShoeTable or Arrow table containing shoe data
+        filename: Path of the file to write
+    """
+    if pa is None:
+        print("Saving Arrow files requires the 'pyarrow' package.")
+        return
+    
+    try:
+        if isinstance(data, ShoeTable):
+            table = data.to_arrow()
+        elif isinstance(data, pa.Table):
+            table = data
+        else:
+            table = pa.Table.from_pandas(encode_shoe_columns(data.copy(deep=False)), preserve_index=False)
+        pa_feather.write_feather(table, filename, compression='uncompressed')
+        print(f"Arrow data saved to {filename}")
+    except Exception as e:
+        print(f"An error occurred while saving the Arrow file: {e}")
 
-def analyze_shoes(df, save_figures=False):
+def count_quantile(values, counts, q):
+    """Computes a quantile of data given as counts of its distinct values.
+    
+    Interpolates linearly between order statistics, as pandas and NumPy do
+    by default, without expanding the counts back into rows.
+    
+    Args:
+        values: Distinct values, in increasing order
+        counts: Count of each value; a 2-D array gives one quantile per row
+        q: Quantile to compute, between 0 and 1
+    """
+    values = np.asarray(values, dtype=np.float64)
+    one_row = np.ndim(counts) == 1
+    counts = np.atleast_2d(counts)
+    totals = counts.sum(axis=1)
+    cumulative = np.cumsum(counts, axis=1)
+    
+    def order_statistic(k):
+        # The k-th smallest value (0-based) of each row is the first value whose cumulative count exceeds k
+        return values[(cumulative > k[:, None]).argmax(axis=1)] if len(values) else np.zeros(len(k))
+    
+    position = q * (totals - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, totals - 1)
+    low_value = order_statistic(lower)
+    result = low_value + (order_statistic(upper) - low_value) * (position - lower)
+    return result[0] if one_row else result
+
+class ShoeTable:
+    """A shoe inventory held as NumPy arrays, for aggregating without pandas.
+    
+    Each text column is stored as integer codes into a dictionary of its
+    distinct values, the same layout as the categorical DataFrame columns,
+    and sizes as a float32 array. Counts, cross-tabs and size distributions
+    are computed with bincount kernels over the codes; half sizes are
+    counted in their fixed-point encoding (see encode_sizes), and other
+    sizes by their exact values (see size_index).
+    
+    A table may hold only some of the columns, when it was loaded for
+    outputs that do not need the others (see PANEL_COLUMNS).
+    """
+    
+    def __init__(self, codes, dictionaries, sizes=None, row_count=None):
+        """
+        Args:
+            codes: Dict mapping text fields to integer code arrays
+            dictionaries: Dict mapping the same fields to their distinct values
+            sizes: Shoe sizes, one per row, or None if not loaded
+            row_count: Number of rows; only needed when no column is loaded
+        """
+        self.codes = {field: np.asarray(codes[field]) for field in TEXT_FIELDS if field in codes}
+        self.dictionaries = {field: np.asarray(dictionaries[field], dtype=object) for field in self.codes}
+        self.sizes = None if sizes is None else np.asarray(sizes, dtype=np.float32)
+        self._size_codes = None
+        self._size_index = None
+        self._index = None
+        if row_count is None:
+            lengths = [len(column) for column in self.codes.values()] + ([] if sizes is None else [len(self.sizes)])
+            row_count = lengths[0] if lengths else 0
+        self.row_count = row_count
+    
+    @property
+    def columns(self):
+        """The shoe fields held by this table, in SHOE_FIELDS order."""
+        return [field for field in SHOE_FIELDS if field in self.codes or (field == 'size' and self.sizes is not None)]
+    
+    @classmethod
+    def from_dataframe(cls, df):
+        """Builds a ShoeTable from a shoe DataFrame, sharing its categorical codes where possible."""
+        df = encode_shoe_columns(df.copy(deep=False))
+        fields = [field for field in TEXT_FIELDS if field in df]
+        return cls({field: df[field].cat.codes.to_numpy() for field in fields},
+                   {field: df[field].cat.categories.to_numpy(dtype=object) for field in fields},
+                   df['size'].to_numpy() if 'size' in df else None, row_count=len(df))
+    
+    @classmethod
+    def from_arrow(cls, table):
+        """Builds a ShoeTable from an Arrow table with dictionary-encoded text columns.
+        
+        Single-chunk columns are shared with Arrow without copying; only the
+        dictionaries are converted to Python strings. Columns other than the
+        shoe fields are ignored, and plain string columns are encoded first.
+        """
+        codes = {}
+        dictionaries = {}
+        for field in TEXT_FIELDS:
+            if field not in table.column_names:
+                continue
+            column = table.column(field)
+            if not pa.types.is_dictionary(column.type):
+                column = column.dictionary_encode()
+            if column.num_chunks > 1:
+                column = column.unify_dictionaries()
+            chunks = column.chunks or [pa.array([], type=column.type)]
+            codes[field] = (chunks[0].indices.to_numpy() if len(chunks) == 1
+                            else np.concatenate([chunk.indices.to_numpy() for chunk in chunks]))
+            dictionaries[field] = chunks[0].dictionary.to_numpy(zero_copy_only=False)
+        sizes = table.column('size').cast(pa.float32()).to_numpy() if 'size' in table.column_names else None
+        return cls(codes, dictionaries, sizes, row_count=table.num_rows)
+    
+    def to_arrow(self):
+        """Converts the table to an Arrow table with dictionary-encoded text columns and float32 sizes.
+        
+        The code and size arrays are handed to Arrow without copying.
+        """
+        columns = {field: pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(self.dictionaries[field], type=pa.string()))
+                   for field, codes in self.codes.items()}
+        if self.sizes is not None:
+            columns['size'] = pa.array(self.sizes)
+        return pa.table([columns[field] for field in self.columns], names=self.columns)
+    
+    def to_dataframe(self):
+        """Converts the table to an encoded shoe DataFrame."""
+        columns = {field: _sorted_categorical(codes, self.dictionaries[field]) for field, codes in self.codes.items()}
+        if self.sizes is not None:
+            columns['size'] = self.sizes
+        df = pd.DataFrame(columns, index=pd.RangeIndex(self.row_count))
+        return encode_shoe_columns(df[self.columns])
+    
+    def __len__(self):
+        return self.row_count
+    
+    def take(self, indices):
+        """Returns a new ShoeTable with the rows selected by an index array or boolean mask."""
+        indices = np.asarray(indices)
+        row_count = int(np.count_nonzero(indices)) if indices.dtype == bool else len(indices)
+        return ShoeTable({field: codes[indices] for field, codes in self.codes.items()}, self.dictionaries,
+                         None if self.sizes is None else self.sizes[indices], row_count=row_count)
+    
+    def index(self):
+        """Returns the ShoeIndex of this table, built on first use and kept for later queries."""
+        if self._index is None:
+            self._index = ShoeIndex(self)
+        return self._index
+    
+    def filter(self, expression):
+        """Returns a new ShoeTable with the rows matching a filter expression (see parse_filter)."""
+        return self.index().filter(expression)
+    
+    def rows(self):
+        """Yields the rows as Shoe records, which need every column of SHOE_FIELDS."""
+        missing = [field for field in SHOE_FIELDS if field not in self.columns]
+        if missing:
+            raise ValueError(f"Shoe records need columns that were not loaded: {', '.join(missing)}")
+        columns = [self.dictionaries[field][self.codes[field]] for field in TEXT_FIELDS]
+        for brand, name, color, usage, size in zip(*columns, self.sizes):
+            yield Shoe(brand, name, color, usage, size)
+    
+    def counts(self, field):
+        """Returns the number of rows per dictionary value of a text column."""
+        return np.bincount(self.codes[field], minlength=len(self.dictionaries[field]))
+    
+    def value_counts(self, field):
+        """Returns (values, counts) for a text column, most common first.
+        
+        Values that never occur are left out; ties keep dictionary order.
+        """
+        counts = self.counts(field)
+        order = np.argsort(-counts, kind='stable')
+        order = order[counts[order] > 0]
+        return self.dictionaries[field][order], counts[order]
+    
+    def crosstab(self, row_field, column_field):
+        """Cross-tabulates two text columns with one bincount over their combined codes.
+        
+        Returns (row_values, column_values, counts), where counts is a 2-D
+        array. Like pd.crosstab, rows and columns that never occur are left out.
+        """
+        width = len(self.dictionaries[column_field])
+        combined = self.codes[row_field].astype(np.int64) * width + self.codes[column_field]
+        counts = np.bincount(combined, minlength=len(self.dictionaries[row_field]) * width).reshape(-1, width)
+        rows = counts.sum(axis=1) > 0
+        columns = counts.sum(axis=0) > 0
+        return (self.dictionaries[row_field][rows], self.dictionaries[column_field][columns],
+                counts[rows][:, columns])
+    
+    @property
+    def size_codes(self):
+        """Sizes encoded by encode_sizes, computed on first use."""
+        if self._size_codes is None:
+            self._size_codes = encode_sizes(self.sizes)
+        return self._size_codes
+    
+    def size_index(self):
+        """Returns (sizes, index): the distinct sizes in increasing order and each row's position among them.
+        
+        When every size is a half size (or the readers' 0 for an invalid
+        one), they are numbered with one bincount over size_codes. Otherwise
+        some sizes are off the grid, negative or too large to encode, and the
+        exact sizes are numbered with np.unique instead, so no statistic
+        rounds them.
+        """
+        if self._size_index is None:
+            codes = self.size_codes
+            if np.array_equal(decode_sizes(codes), self.sizes):
+                slots = codes.astype(np.int64) - INVALID_SIZE_CODE
+                distinct = np.flatnonzero(np.bincount(slots))
+                dense = np.zeros(distinct[-1] + 1 if len(distinct) else 0, dtype=np.int64)
+                dense[distinct] = np.arange(len(distinct))
+                self._size_index = (decode_sizes(distinct + INVALID_SIZE_CODE), dense[slots])
+            else:
+                sizes, index = np.unique(self.sizes, return_inverse=True)
+                self._size_index = (sizes, index.astype(np.int64))
+        return self._size_index
+    
+    def size_counts(self):
+        """Returns (sizes, counts) for every distinct size present, in increasing order.
+        
+        One bincount over size_index; invalid sizes are reported as 0, the
+        value the readers give them.
+        """
+        sizes, index = self.size_index()
+        return sizes, np.bincount(index, minlength=len(sizes))
+    
+    def size_counts_by(self, field):
+        """Counts sizes separately for each value of a text column.
+        
+        Returns (values, sizes, counts): the values that occur, the distinct
+        sizes present, and a 2-D array of counts with one row per value. It
+        is built with one bincount over combined value and size positions.
+        """
+        sizes, index = self.size_index()
+        width = len(sizes)
+        combined = self.codes[field].astype(np.int64) * width + index
+        counts = np.bincount(combined, minlength=len(self.dictionaries[field]) * width)
+        counts = counts.reshape(len(self.dictionaries[field]), width)
+        present = counts.sum(axis=1) > 0
+        return self.dictionaries[field][present], sizes, counts[present]
+
+def kde_bandwidth(values, counts):
+    """Returns the Gaussian KDE bandwidth of counted values by Scott's rule, as seaborn would use for every row.
+    
+    The counts are row frequencies, so the standard deviation is the one of
+    the repeated values, and the rule uses the number of rows, not of
+    distinct values.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    return np.sqrt(np.cov(np.asarray(values, dtype=np.float64), fweights=counts)) * counts.sum() ** -0.2
+
+def binned_kde(values, counts, support, bandwidth, grid_size=KDE_FFT_GRID_SIZE):
+    """Estimates a Gaussian kernel density of counted values at the support points, by binning and FFT.
+    
+    The counts are spread linearly over grid_size evenly spaced bins, the
+    bins are convolved with the Gaussian kernel through an FFT, and the
+    result is interpolated at the support points. The cost depends on the
+    grid size, not on the number of rows or distinct values.
+    
+    Args:
+        values: Distinct values
+        counts: Count of each value
+        support: Points at which to evaluate the density
+        bandwidth: Standard deviation of the Gaussian kernel
+        grid_size: Number of bins
+    """
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.float64)
+    reach = KDE_KERNEL_REACH * bandwidth
+    low = min(values.min(), support[0]) - reach
+    high = max(values.max(), support[-1]) + reach
+    step = (high - low) / (grid_size - 1)
+    
+    # Linear binning: each value's count is shared between its two neighbouring bins
+    position = (values - low) / step
+    left = np.minimum(np.floor(position).astype(np.int64), grid_size - 2)
+    fraction = position - left
+    binned = (np.bincount(left, counts * (1 - fraction), minlength=grid_size)
+              + np.bincount(left + 1, counts * fraction, minlength=grid_size))
+    
+    # Convolve with the kernel sampled on the same grid, zero-padded so nothing wraps around
+    half_width = min(int(np.ceil(reach / step)), grid_size - 1)
+    offsets = np.arange(-half_width, half_width + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    length = grid_size + len(kernel) - 1
+    density = np.fft.irfft(np.fft.rfft(binned, length) * np.fft.rfft(kernel, length), length)
+    density = density[half_width:half_width + grid_size] / counts.sum()
+    return np.interp(support, low + np.arange(grid_size) * step, np.maximum(density, 0))
+
+def size_count_stats(values, sizes, counts):
+    """Computes size statistics per group from counts of each distinct size.
+    
+    Args:
+        values: The groups, e.g. colors
+        sizes: Distinct sizes, in increasing order
+        counts: 2-D array of counts, one row per group and one column per size
+    
+    Returns:
+        Dict of arrays with one entry per group: 'values', 'count', 'mean',
+        'min', 'q1', 'median', 'q3', 'max'
+    """
+    totals = counts.sum(axis=1)
+    return {
+        'values': values,
+        'count': totals,
+        'mean': counts @ np.asarray(sizes, dtype=np.float64) / totals,
+        'min': count_quantile(sizes, counts, 0.0),
+        'q1': count_quantile(sizes, counts, 0.25),
+        'median': count_quantile(sizes, counts, 0.5),
+        'q3': count_quantile(sizes, counts, 0.75),
+        'max': count_quantile(sizes, counts, 1.0),
+    }
+
+class BrandHeavyHitters:
+    """A Space-Saving summary of the most common brands and their usage breakdown, in bounded memory.
+    
+    At most `capacity` brands are tracked, whatever the number of distinct
+    brands. Each tracked brand has an estimated count that never
+    underestimates its true count and overestimates it by at most its
+    error, and usage counts that add up to the guaranteed part of its count
+    (count - error). No untracked brand has more than `floor` shoes, and no
+    error exceeds total / capacity.
+    
+    Summaries built from exact counts (from_counts) and merged with merge()
+    keep these bounds in any order of merging, following the mergeable
+    Space-Saving of Cafaro et al.: a brand missing from one side is assumed
+    to have that side's floor, both in its count and in its error. Merging
+    summaries of different capacities keeps the larger one, but the error
+    bound is then total / the smallest capacity merged.
+    
+    Attributes:
+        capacity: Maximum number of brands tracked
+        values: Tracked brands, most common first (ties in alphabetical order)
+        counts: Estimated count of each tracked brand
+        errors: Maximum overestimate of each count
+        usage_counts: 2-D array of guaranteed counts per usage (VALID_USAGES
+            order), one row per brand, or None if usage was not summarized
+        floor: Largest count an untracked brand can have
+        total: Number of shoes summarized
+    """
+    
+    def __init__(self, capacity, values, counts, errors, usage_counts=None, floor=0, total=0):
+        self.capacity = capacity
+        self.values = np.asarray(values, dtype=object)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.errors = np.asarray(errors, dtype=np.int64)
+        self.usage_counts = None if usage_counts is None else np.asarray(usage_counts, dtype=np.int64).reshape(-1, len(VALID_USAGES))
+        self.floor = floor
+        self.total = total
+    
+    @classmethod
+    def from_counts(cls, capacity, brands, counts, usages=None, usage_counts=None):
+        """Builds a summary from exact counts, keeping the `capacity` most common brands.
+        
+        Args:
+            capacity: Maximum number of brands to track
+            brands: Distinct brands
+            counts: Exact count of each brand
+            usages: Optional usage values labelling the columns of usage_counts
+            usage_counts: Optional 2-D array of exact counts per brand and usage
+        """
+        brands = np.asarray(brands, dtype=object)
+        counts = np.asarray(counts, dtype=np.int64)
+        if usage_counts is not None:
+            # Lay the usage columns out in VALID_USAGES order, whichever of them occur
+            aligned = np.zeros((len(brands), len(VALID_USAGES)), dtype=np.int64)
+            aligned[:, [VALID_USAGES.index(usage) for usage in usages]] = usage_counts
+            usage_counts = aligned
+        return cls._truncate(capacity, brands, counts, np.zeros(len(brands), dtype=np.int64), usage_counts,
+                             0, int(counts.sum()))
+    
+    @classmethod
+    def _truncate(cls, capacity, brands, counts, errors, usage_counts, floor, total):
+        """Keeps the `capacity` largest counts; the largest count dropped raises the floor."""
+        order = np.lexsort((brands.astype(str), -counts)) if len(brands) else np.zeros(0, dtype=np.int64)
+        kept, dropped = order[:capacity], order[capacity:]
+        if len(dropped):
+            floor = max(floor, int(counts[dropped].max()))
+        return cls(capacity, brands[kept], counts[kept], errors[kept],
+                   None if usage_counts is None else usage_counts[kept], floor, total)
+    
+    def truncated(self, capacity):
+        """Returns the summary with its capacity changed, dropping the least common brands if it shrinks."""
+        return BrandHeavyHitters._truncate(capacity, self.values, self.counts, self.errors, self.usage_counts,
+                                           self.floor, self.total)
+    
+    def merge(self, other):
+        """Returns the summary of the shoes of both summaries, tracking the larger capacity."""
+        union = _merged_labels('brand', [self.values, other.values])
+        index = {value: i for i, value in enumerate(union.tolist())}
+        counts = np.zeros(len(union), dtype=np.int64)
+        errors = np.zeros(len(union), dtype=np.int64)
+        for side in (self, other):
+            positions = [index[value] for value in side.values.tolist()]
+            side_counts = np.full(len(union), side.floor, dtype=np.int64)
+            side_counts[positions] = side.counts
+            side_errors = np.full(len(union), side.floor, dtype=np.int64)
+            side_errors[positions] = side.errors
+            counts += side_counts
+            errors += side_errors
+        usage_counts = None
+        if self.usage_counts is not None and other.usage_counts is not None:
+            usage_counts = np.zeros((len(union), len(VALID_USAGES)), dtype=np.int64)
+            for side in (self, other):
+                usage_counts[[index[value] for value in side.values.tolist()]] += side.usage_counts
+        return BrandHeavyHitters._truncate(max(self.capacity, other.capacity), union, counts, errors, usage_counts,
+                                           self.floor + other.floor, self.total + other.total)
+    
+    def top(self, k):
+        """Returns (brands, counts, errors) for the k brands with the largest estimated counts."""
+        return self.values[:k], self.counts[:k], self.errors[:k]
+    
+    def is_exact_top(self, k):
+        """Tells whether the first k brands are certainly the k most common, whatever the errors."""
+        lower_bounds = (self.counts - self.errors)[:k]
+        rival = max(int(self.counts[k]) if k < len(self.counts) else 0, self.floor)
+        return len(lower_bounds) == 0 or int(lower_bounds.min()) >= rival
+    
+    def to_dict(self):
+        """Converts the summary to plain lists and numbers, for JSON."""
+        return {
+            'capacity': self.capacity,
+            'values': self.values.tolist(),
+            'counts': self.counts.tolist(),
+            'errors': self.errors.tolist(),
+            'usage_counts': None if self.usage_counts is None else self.usage_counts.tolist(),
+            'floor': self.floor,
+            'total': self.total,
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a summary from the output of to_dict."""
+        return cls(data['capacity'], data['values'], data['counts'], data['errors'], data['usage_counts'],
+                   data['floor'], data['total'])
+
+class CollectionSummary:
+    """The statistics analyze_shoes plots, computed in one pass over the encoded columns.
+    
+    The brand and usage columns are read once, by a single bincount over
+    their combined codes, and so are the color and size columns. The counts
+    per brand, color and usage and the size histogram are marginals of those
+    two tables, so no column is scanned twice. Plotting uses only the
+    summary, which stays small however many shoes it describes.
+    
+    Only the columns a table holds are summarized (see PANEL_COLUMNS).
+    
+    Summaries of different parts of an inventory merge into the summary of
+    the whole (merge_summaries), in any order and grouping, and save to
+    small JSON files (save_summary), so partial summaries can be computed
+    wherever the data lives and combined later.
+    
+    Attributes:
+        total: Number of shoes summarized
+        counts: Dict mapping the summarized text fields among brand, color
+            and usage to (values, counts), for the values that occur, in
+            dictionary order
+        size_counts: (sizes, counts) for the distinct sizes, in increasing
+            order, or None without the size column
+        brand_usage: (brands, usages, 2-D counts), or None unless both
+            columns were summarized
+        color_sizes: (colors, sizes, 2-D counts), or None unless both
+            columns were summarized
+        brand_sketch: BrandHeavyHitters tracking the most common brands, in
+            place of the exact brand counts and brand_usage, or None
+    """
+    
+    def __init__(self, total, counts, size_counts=None, brand_usage=None, color_sizes=None, brand_sketch=None):
+        self.total = total
+        self.counts = counts
+        self.size_counts = size_counts
+        self.brand_usage = brand_usage
+        self.color_sizes = color_sizes
+        self.brand_sketch = brand_sketch
+    
+    @classmethod
+    def from_table(cls, shoes, brand_capacity=None):
+        """Summarizes a ShoeTable (or a shoe DataFrame or Arrow table).
+        
+        Args:
+            shoes: The shoes to summarize
+            brand_capacity: If given, only this many brands are kept, in a
+                BrandHeavyHitters sketch with error bounds, so the summary
+                stays small however many distinct brands there are
+        """
+        if not isinstance(shoes, ShoeTable):
+            shoes = (ShoeTable.from_arrow(shoes) if pa is not None and isinstance(shoes, pa.Table)
+                     else ShoeTable.from_dataframe(shoes))
+        columns = shoes.columns
+        counts = {}
+        size_counts = brand_usage = color_sizes = None
+        
+        if 'brand' in columns and 'usage' in columns:
+            brand_usage = shoes.crosstab('brand', 'usage')
+            brands, usages, table = brand_usage
+            counts['brand'] = (brands, table.sum(axis=1))
+            counts['usage'] = (usages, table.sum(axis=0))
+        if 'color' in columns and 'size' in columns:
+            color_sizes = shoes.size_counts_by('color')
+            colors, sizes, table = color_sizes
+            counts['color'] = (colors, table.sum(axis=1))
+            size_counts = (sizes, table.sum(axis=0))
+        
+        # Columns loaded without their partner are counted on their own
+        for field in ('brand', 'color', 'usage'):
+            if field in columns and field not in counts:
+                field_counts = shoes.counts(field)
+                present = field_counts > 0
+                counts[field] = (shoes.dictionaries[field][present], field_counts[present])
+        if 'size' in columns and size_counts is None:
+            size_counts = shoes.size_counts()
+        summary = cls(len(shoes), counts, size_counts, brand_usage, color_sizes)
+        if brand_capacity is not None and 'brand' in counts:
+            summary.brand_sketch = summary._brand_sketch(brand_capacity)
+            del summary.counts['brand']
+            summary.brand_usage = None
+        return summary
+    
+    def with_brand_capacity(self, capacity):
+        """Returns a copy of the summary whose brands are tracked by a sketch of the given capacity."""
+        sketch = self._brand_sketch(capacity)
+        if sketch is None:
+            return self
+        counts = {field: value for field, value in self.counts.items() if field != 'brand'}
+        return CollectionSummary(self.total, counts, self.size_counts, None, self.color_sizes, sketch.truncated(capacity))
+    
+    def _brand_sketch(self, capacity):
+        """Returns the brand sketch, building it from the exact counts if there is none; None without brands."""
+        if self.brand_sketch is not None:
+            return self.brand_sketch
+        if self.brand_usage is not None:
+            brands, usages, counts = self.brand_usage
+            return BrandHeavyHitters.from_counts(capacity, brands, counts.sum(axis=1), usages, counts)
+        if 'brand' in self.counts:
+            return BrandHeavyHitters.from_counts(capacity, *self.counts['brand'])
+        return None
+    
+    def merge(self, other):
+        """Returns the summary of the shoes summarized by this summary and another.
+        
+        Counts are added value by value. Only the columns both summaries
+        cover are kept.
+        """
+        counts = {field: _merge_counts(field, None, [self.counts[field], other.counts[field]])
+                  for field in self.counts if field in other.counts}
+        size_counts = brand_usage = color_sizes = brand_sketch = None
+        if self.brand_sketch is not None or other.brand_sketch is not None:
+            # Exact brand counts merged into a sketch become part of the sketch
+            capacity = max(summary.brand_sketch.capacity for summary in (self, other) if summary.brand_sketch is not None)
+            sketches = [summary._brand_sketch(capacity) for summary in (self, other)]
+            if None not in sketches:
+                brand_sketch = sketches[0].merge(sketches[1])
+            counts.pop('brand', None)
+        if self.size_counts is not None and other.size_counts is not None:
+            size_counts = _merge_counts('size', None, [self.size_counts, other.size_counts])
+        if self.brand_usage is not None and other.brand_usage is not None:
+            brand_usage = _merge_counts('brand', 'usage', [self.brand_usage, other.brand_usage])
+        if self.color_sizes is not None and other.color_sizes is not None:
+            color_sizes = _merge_counts('color', 'size', [self.color_sizes, other.color_sizes])
+        return CollectionSummary(self.total + other.total, counts, size_counts, brand_usage, color_sizes, brand_sketch)
+    
+    def to_dict(self):
+        """Converts the summary to plain lists and numbers, for JSON."""
+        def table(values, columns, counts):
+            return {'values': values.tolist(), 'columns': columns.tolist(), 'counts': counts.tolist()}
+        
+        return {
+            'version': SUMMARY_FORMAT_VERSION,
+            'total': int(self.total),
+            'counts': {field: {'values': values.tolist(), 'counts': counts.tolist()}
+                       for field, (values, counts) in self.counts.items()},
+            'size_counts': None if self.size_counts is None else {
+                'values': self.size_counts[0].tolist(), 'counts': self.size_counts[1].tolist()},
+            'brand_usage': None if self.brand_usage is None else table(*self.brand_usage),
+            'color_sizes': None if self.color_sizes is None else table(*self.color_sizes),
+            'brand_sketch': None if self.brand_sketch is None else self.brand_sketch.to_dict(),
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a summary from the output of to_dict. Raises ValueError for another format version."""
+        if data.get('version') != SUMMARY_FORMAT_VERSION:
+            raise ValueError(f"Unsupported summary format version: {data.get('version')}")
+        
+        def labels(field, values):
+            return np.asarray(values, dtype=np.float32 if field == 'size' else object)
+        
+        def table(row_field, column_field, part):
+            if part is None:
+                return None
+            counts = np.asarray(part['counts'], dtype=np.int64).reshape(len(part['values']), len(part['columns']))
+            return labels(row_field, part['values']), labels(column_field, part['columns']), counts
+        
+        counts = {field: (labels(field, part['values']), np.asarray(part['counts'], dtype=np.int64))
+                  for field, part in data['counts'].items()}
+        size_counts = data['size_counts']
+        if size_counts is not None:
+            size_counts = (labels('size', size_counts['values']), np.asarray(size_counts['counts'], dtype=np.int64))
+        brand_sketch = data.get('brand_sketch')
+        return cls(data['total'], counts, size_counts, table('brand', 'usage', data['brand_usage']),
+                   table('color', 'size', data['color_sizes']),
+                   None if brand_sketch is None else BrandHeavyHitters.from_dict(brand_sketch))
+    
+    def __len__(self):
+        return self.total
+    
+    @property
+    def columns(self):
+        """The shoe fields this summary covers, in SHOE_FIELDS order."""
+        return [field for field in SHOE_FIELDS if field in self.counts or (field == 'size' and self.size_counts is not None)
+                or (field == 'brand' and self.brand_sketch is not None)]
+    
+    def most_common(self, field, k=None):
+        """Returns (values, counts) for a text field, most common first, ties in dictionary order.
+        
+        Args:
+            field: 'brand', 'color' or 'usage'
+            k: Optional number of values to keep
+        
+        Brand counts tracked by a sketch are estimates; see brand_errors.
+        """
+        if field == 'brand' and self.brand_sketch is not None:
+            values, counts, _ = self.brand_sketch.top(len(self.brand_sketch.values) if k is None else k)
+            return values, counts
+        values, counts = self.counts[field]
+        order = np.argsort(-counts, kind='stable')[:k]
+        return values[order], counts[order]
+    
+    def brand_errors(self, k):
+        """Returns how much each of the k brand counts from most_common may overestimate; zeros when exact."""
+        if self.brand_sketch is not None:
+            return self.brand_sketch.top(k)[2]
+        return np.zeros(min(k, len(self.counts['brand'][0])), dtype=np.int64)
+    
+    def top_brand_usage(self, k):
+        """Returns (brands, usages, counts) for the k brands with the most shoes, most first.
+        
+        With a brand sketch, the counts are the guaranteed usage counts of
+        the tracked brands, for the usages that occur among them.
+        """
+        if self.brand_sketch is not None:
+            brands, _, _ = self.brand_sketch.top(k)
+            counts = self.brand_sketch.usage_counts[:k]
+            present = self.brand_sketch.usage_counts.sum(axis=0) > 0
+            return brands, np.asarray(VALID_USAGES, dtype=object)[present], counts[:, present]
+        brands, usages, counts = self.brand_usage
+        top = np.argsort(-counts.sum(axis=1), kind='stable')[:k]
+        return brands[top], usages, counts[top]
+    
+    def size_stats_by_color(self):
+        """Computes count, mean, min, quartiles and max of the sizes of each color (see size_count_stats)."""
+        return size_count_stats(*self.color_sizes)
+    
+    def size_box_stats(self, whis=1.5, max_fliers=BOXPLOT_MAX_FLIERS):
+        """Computes the boxplot statistics of the sizes of each color, as matplotlib's bxp expects them.
+        
+        Quartiles come from the counts of each distinct size (count_quantile).
+        Whiskers reach the most extreme sizes within whis times the
+        interquartile range of the box, and each distinct size beyond them is
+        one flier, as in a boxplot of every row. The counts cover the discrete
+        half-size domain, so the statistics are exact however many shoes were
+        summarized.
+        
+        Args:
+            whis: Whisker reach, in interquartile ranges
+            max_fliers: Most extreme distinct sizes kept as fliers on each
+                side of a box; None keeps them all
+        
+        Returns:
+            List with one dict per color, in dictionary order
+        """
+        colors, sizes, counts = self.color_sizes
+        sizes = sizes.astype(np.float64)
+        q1 = count_quantile(sizes, counts, 0.25)
+        median = count_quantile(sizes, counts, 0.5)
+        q3 = count_quantile(sizes, counts, 0.75)
+        stats = []
+        for i, color in enumerate(colors):
+            iqr = q3[i] - q1[i]
+            present = sizes[counts[i] > 0]
+            inside = present[(present >= q1[i] - whis * iqr) & (present <= q3[i] + whis * iqr)]
+            low, high = (inside.min(), inside.max()) if len(inside) else (q1[i], q3[i])
+            below, above = present[present < low], present[present > high]
+            if max_fliers is not None:
+                below, above = below[:max_fliers], above[len(above) - min(max_fliers, len(above)):]
+            stats.append({
+                'label': color,
+                'q1': q1[i], 'med': median[i], 'q3': q3[i],
+                'whislo': min(low, q1[i]), 'whishi': max(high, q3[i]),
+                'fliers': np.concatenate([below, above]),
+            })
+        return stats
+
+def _merged_labels(field, label_lists):
+    """Returns the union of the values of a field, in the order a ShoeTable dictionary would list them."""
+    labels = set()
+    for values in label_lists:
+        labels.update(values.tolist())
+    if field == 'usage':
+        rank = {usage: i for i, usage in enumerate(VALID_USAGES)}
+        return np.asarray(sorted(labels, key=lambda usage: (rank.get(usage, len(rank)), usage)), dtype=object)
+    return np.asarray(sorted(labels), dtype=np.float32 if field == 'size' else object)
+
+def _merge_counts(row_field, column_field, parts):
+    """Adds counts labelled by the values of one field (or a pair of fields), aligning them by value.
+    
+    Args:
+        row_field: Field labelling the counts, or their rows
+        column_field: Field labelling the columns of 2-D counts, or None for 1-D counts
+        parts: List of (values, counts), or (row values, column values, counts) for 2-D counts
+    """
+    rows = _merged_labels(row_field, [part[0] for part in parts])
+    row_index = {value: i for i, value in enumerate(rows.tolist())}
+    if column_field is None:
+        merged = np.zeros(len(rows), dtype=np.int64)
+        for values, counts in parts:
+            merged[[row_index[value] for value in values.tolist()]] += counts
+        return rows, merged
+    columns = _merged_labels(column_field, [part[1] for part in parts])
+    column_index = {value: i for i, value in enumerate(columns.tolist())}
+    merged = np.zeros((len(rows), len(columns)), dtype=np.int64)
+    for row_values, column_values, counts in parts:
+        merged[np.ix_([row_index[value] for value in row_values.tolist()],
+                      [column_index[value] for value in column_values.tolist()])] += counts
+    return rows, columns, merged
+
+def merge_summaries(summaries):
+    """Merges CollectionSummary objects into the summary of all their shoes, or None if there are none.
+    
+    Merging is associative and commutative, so partial summaries can be
+    combined in any order or grouping with the same result.
+    """
+    summaries = list(summaries)
+    if not summaries:
+        return None
+    return reduce(CollectionSummary.merge, summaries)
+
+def save_summary(summary, filename):
+    """Saves a CollectionSummary as a JSON file.
+    
+    Args:
+        summary: The summary to save
+        filename: Path of the file to write
+    """
+    try:
+        with open(filename, 'w') as file:
+            json.dump(summary.to_dict(), file)
+        print(f"Summary saved to {filename}")
+    except Exception as e:
+        print(f"An error occurred while saving the summary: {e}")
+
+def load_summary(filename):
+    """Loads a CollectionSummary saved by save_summary, or returns None if it cannot be read."""
+    try:
+        with open(filename) as file:
+            return CollectionSummary.from_dict(json.load(file))
+    except FileNotFoundError:
+        print(f"Summary file '{filename}' not found.")
+    except Exception as e:
+        print(f"An error occurred while reading the summary '{filename}': {e}")
+    return None
+
+class ShoeCube:
+    """Counts of shoes for every combination of brand, color, usage and size, computed once.
+    
+    The cube is built with one pass over the encoded columns: the codes of
+    a row's four fields are combined into a single cell number. Any two- or
+    three-way marginal, optionally restricted to some values of the other
+    fields, is then answered by summing cells, without reading the rows
+    again.
+    
+    Cubes with at most CUBE_DENSE_MAX_CELLS cells are stored as a dense
+    array; larger ones (e.g. with very many brands) keep only the cells
+    that occur, as sorted cell numbers with their counts.
+    
+    Attributes:
+        fields: The dimensions, a subset of CUBE_FIELDS in that order
+        labels: Dict mapping each field to the values along its dimension
+        shape: Number of values along each dimension
+        cells: Sorted numbers of the non-empty cells (sparse cubes), or None
+        counts: Count of each non-empty cell (sparse), or the dense array
+    """
+    
+    def __init__(self, fields, labels, counts, cells=None):
+        self.fields = list(fields)
+        self.labels = labels
+        self.shape = tuple(len(labels[field]) for field in self.fields)
+        self.cells = cells
+        self.counts = counts
+    
+    @classmethod
+    def from_table(cls, shoes, fields=None):
+        """Builds the cube from a ShoeTable (or a shoe DataFrame).
+        
+        Args:
+            shoes: The shoes to count
+            fields: Dimensions to keep (default: every field of CUBE_FIELDS the table holds)
+        """
+        if not isinstance(shoes, ShoeTable):
+            shoes = ShoeTable.from_dataframe(shoes)
+        fields = [field for field in CUBE_FIELDS if field in (fields or shoes.columns)]
+        missing = [field for field in fields if field not in shoes.columns]
+        if missing:
+            raise ValueError(f"The cube needs columns that were not loaded: {', '.join(missing)}")
+        
+        labels = {}
+        codes = []
+        for field in fields:
+            if field == 'size':
+                labels[field], size_index = shoes.size_index()
+                codes.append(size_index)
+            else:
+                labels[field] = shoes.dictionaries[field]
+                codes.append(shoes.codes[field])
+        shape = tuple(len(labels[field]) for field in fields)
+        cells = np.ravel_multi_index(codes, shape) if fields else np.zeros(len(shoes), dtype=np.int64)
+        if np.prod(shape, dtype=np.float64) <= CUBE_DENSE_MAX_CELLS:
+            return cls(fields, labels, np.bincount(cells, minlength=int(np.prod(shape))).reshape(shape))
+        cells, counts = np.unique(cells, return_counts=True)
+        return cls(fields, labels, counts, cells)
+    
+    @property
+    def total(self):
+        """Number of shoes counted."""
+        return int(self.counts.sum())
+    
+    def _selection(self, where):
+        """Turns {field: value or list of values} into a boolean mask over each restricted dimension."""
+        masks = {}
+        for field, wanted in where.items():
+            if field not in self.fields:
+                raise ValueError(f"Unknown cube field: {field}. Choose from: {', '.join(self.fields)}")
+            wanted = [wanted] if np.isscalar(wanted) else list(wanted)
+            masks[field] = np.isin(self.labels[field], np.asarray(wanted, dtype=self.labels[field].dtype))
+        return masks
+    
+    def marginal(self, *fields, **where):
+        """Sums the cube over every field not listed.
+        
+        Keyword arguments restrict a field to one value or a list of values
+        before summing, e.g. marginal('brand', 'usage', color='Black').
+        
+        Returns:
+            (labels, counts): the values along each listed field that occur,
+            and an array with one dimension per listed field
+        """
+        unknown = [field for field in fields if field not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown cube field(s): {', '.join(unknown)}. Choose from: {', '.join(self.fields)}")
+        masks = self._selection(where)
+        axes = [self.fields.index(field) for field in fields]
+        
+        if self.cells is None:
+            counts = self.counts
+            for axis, field in enumerate(self.fields):
+                if field in masks:
+                    counts = np.compress(masks[field], counts, axis=axis)
+            labels = {field: self.labels[field][masks[field]] if field in masks else self.labels[field]
+                      for field in self.fields}
+            other_axes = tuple(axis for axis in range(len(self.fields)) if axis not in axes)
+            counts = np.moveaxis(counts.sum(axis=other_axes), np.argsort(np.argsort(axes)), range(len(axes)))
+        else:
+            index = np.unravel_index(self.cells, self.shape)
+            keep = np.ones(len(self.cells), dtype=bool)
+            for field, mask in masks.items():
+                keep &= mask[index[self.fields.index(field)]]
+            labels = self.labels
+            kept_shape = tuple(self.shape[axis] for axis in axes)
+            reduced = np.ravel_multi_index([index[axis][keep] for axis in axes], kept_shape)
+            counts = np.bincount(reduced, self.counts[keep], minlength=int(np.prod(kept_shape)))
+            counts = counts.astype(np.int64).reshape(kept_shape)
+        
+        # Like pd.crosstab, leave out the values that never occur
+        result_labels = []
+        for axis, field in enumerate(fields):
+            other = tuple(i for i in range(len(fields)) if i != axis)
+            present = counts.sum(axis=other) > 0
+            counts = np.compress(present, counts, axis=axis)
+            result_labels.append(labels[field][present])
+        return result_labels, counts
+    
+    def crosstab(self, row_field, column_field, **where):
+        """Returns a two-way marginal as a DataFrame, like pd.crosstab of the two columns of the matching rows."""
+        (rows, columns), counts = self.marginal(row_field, column_field, **where)
+        return pd.DataFrame(counts, index=pd.Index(rows, name=row_field), columns=pd.Index(columns, name=column_field))
+    
+    def value_counts(self, *fields, **where):
+        """Returns the marginal over the listed fields as a Series of the combinations that occur, most common first."""
+        labels, counts = self.marginal(*fields, **where)
+        present = np.nonzero(counts)
+        index = pd.MultiIndex.from_arrays([labels[axis][codes] for axis, codes in enumerate(present)], names=list(fields))
+        return pd.Series(counts[present], index=index, name='count').sort_values(ascending=False, kind='stable')
+
+def _tokenize_filter(expression):
+    """Splits a filter expression into (kind, text) tokens: 'string', 'op', 'punct' or 'word'."""
+    tokens = []
+    position = 0
+    while True:
+        match = FILTER_TOKEN.match(expression, position)
+        if match is None:
+            if expression[position:].strip():
+                raise ValueError(f"Cannot parse filter at: {expression[position:].strip()!r}")
+            return tokens
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        tokens.append((kind, text[1:-1] if kind == 'string' else text))
+
+def parse_filter(expression):
+    """Parses a filter expression over the shoe fields into a tree of tuples.
+    
+    Conditions compare a field with a value (==, !=, <, <=, >, >=; the order
+    comparisons only for size) or test membership (in, not in) in a set of
+    values in braces, and combine with and, or, not and parentheses:
+    
+        brand in {Nike, Adidas} and usage == Athletic and size >= 10
+    
+    Values may be quoted; unquoted values run to the next operator, comma,
+    brace or keyword, so "New Balance" needs no quotes. Sizes must be numbers.
+    
+    Returns:
+        Nested tuples: ('and', left, right), ('or', left, right),
+        ('not', condition), ('in', field, values) or (operator, field, value)
+    
+    Raises:
+        ValueError: If the expression is malformed or names an unknown field
+    """
+    tokens = _tokenize_filter(expression)
+    position = 0
+    
+    def peek():
+        return tokens[position] if position < len(tokens) else (None, None)
+    
+    def keyword(*words):
+        kind, text = peek()
+        return kind == 'word' and text.lower() in words
+    
+    def take(expected=None):
+        nonlocal position
+        kind, text = peek()
+        if kind is None or (expected is not None and text.lower() != expected):
+            raise ValueError(f"Expected {expected or 'more'} in filter, found {text!r}" if kind else
+                             f"Filter ended early; expected {expected or 'a value'}")
+        position += 1
+        return kind, text
+    
+    def value(field):
+        kind, text = take()
+        if kind == 'string':
+            words = [text]
+        elif kind == 'word':
+            words = [text]
+            while peek()[0] == 'word' and not keyword('and', 'or'):
+                words.append(take()[1])
+        else:
+            raise ValueError(f"Expected a value in filter, found {text!r}")
+        if field != 'size':
+            return ' '.join(words)
+        try:
+            return float(' '.join(words))
+        except ValueError:
+            raise ValueError(f"Sizes must be numbers: {' '.join(words)}") from None
+    
+    def condition():
+        if keyword('not'):
+            take()
+            return ('not', condition())
+        if peek() == ('punct', '('):
+            take()
+            inner = disjunction()
+            take(')')
+            return inner
+        kind, field = take()
+        field = field.lower()
+        if kind != 'word' or field not in SHOE_FIELDS:
+            raise ValueError(f"Unknown filter field: {field!r}. Choose from: {', '.join(SHOE_FIELDS)}")
+        negate = keyword('not')
+        if negate:
+            take()
+        if keyword('in'):
+            take()
+            take('{')
+            values = [value(field)]
+            while peek() == ('punct', ','):
+                take()
+                values.append(value(field))
+            take('}')
+            return ('not', ('in', field, values)) if negate else ('in', field, values)
+        kind, operator = take()
+        if negate or kind != 'op':
+            raise ValueError(f"Expected a comparison after {field!r} in filter, found {operator!r}")
+        operator = '==' if operator == '=' else operator
+        if field != 'size' and operator not in ('==', '!='):
+            raise ValueError(f"Only ==, != and in can compare {field!r} values")
+        return (operator, field, value(field))
+    
+    def conjunction():
+        tree = condition()
+        while keyword('and'):
+            take()
+            tree = ('and', tree, condition())
+        return tree
+    
+    def disjunction():
+        tree = conjunction()
+        while keyword('or'):
+            take()
+            tree = ('or', tree, conjunction())
+        return tree
+    
+    tree = disjunction()
+    if position < len(tokens):
+        raise ValueError(f"Unexpected {tokens[position][1]!r} in filter")
+    return tree
+
+class ShoeIndex:
+    """Per-value row indexes over a ShoeTable, for evaluating filter expressions without scanning columns.
+    
+    The first time a field is queried, its rows are sorted by value once
+    (a stable argsort of the codes), so the rows holding any value, or any
+    range of sizes, are one contiguous run of row ids. Fields with at most
+    BITMAP_MAX_VALUES distinct values also get a packed bitmap per value.
+    Conditions are evaluated to packed bitmaps and combined with bitwise
+    and, or and not, so each query touches n / 8 bytes per condition.
+    """
+    
+    def __init__(self, shoes):
+        self.shoes = shoes
+        self.row_count = len(shoes)
+        self._fields = {}
+    
+    def _field(self, field):
+        """Returns the index of one field, building it on first use."""
+        if field not in self._fields:
+            if field not in self.shoes.columns:
+                raise ValueError(f"The filter needs a column that was not loaded: {field}")
+            if field == 'size':
+                # Index the sizes themselves rather than their half-size codes, so off-grid sizes compare exactly
+                labels, codes = np.unique(self.shoes.sizes, return_inverse=True)
+            else:
+                labels, codes = self.shoes.dictionaries[field], self.shoes.codes[field]
+            order = np.argsort(codes, kind='stable')
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(labels)))])
+            bitmaps = None
+            if len(labels) <= BITMAP_MAX_VALUES:
+                bitmaps = np.stack([self._bitmap(order[offsets[code]:offsets[code + 1]]) for code in range(len(labels))]
+                                   ) if len(labels) else np.zeros((0, (self.row_count + 7) // 8), dtype=np.uint8)
+            self._fields[field] = {
+                'labels': labels,
+                'lookup': {label: code for code, label in enumerate(labels.tolist())},
+                'order': order,
+                'offsets': offsets,
+                'bitmaps': bitmaps,
+            }
+        return self._fields[field]
+    
+    def _bitmap(self, rows):
+        """Packs a list of row ids into a bitmap."""
+        mask = np.zeros(self.row_count, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+    
+    def _values_bitmap(self, field, selected):
+        """Returns the bitmap of the rows whose value of field is selected (a boolean array over its values)."""
+        index = self._field(field)
+        codes = np.flatnonzero(selected)
+        if index['bitmaps'] is not None:
+            return np.bitwise_or.reduce(index['bitmaps'][codes], axis=0) if len(codes) else self._bitmap([])
+        offsets = index['offsets']
+        if len(codes) and codes[-1] - codes[0] == len(codes) - 1:
+            return self._bitmap(index['order'][offsets[codes[0]]:offsets[codes[-1] + 1]])  # One contiguous run
+        return self._bitmap(np.concatenate([index['order'][offsets[code]:offsets[code + 1]] for code in codes] or [[]]).astype(np.int64))
+    
+    def _evaluate(self, tree):
+        """Evaluates a parsed filter (see parse_filter) to a bitmap."""
+        operator = tree[0]
+        if operator == 'and':
+            return self._evaluate(tree[1]) & self._evaluate(tree[2])
+        if operator == 'or':
+            return self._evaluate(tree[1]) | self._evaluate(tree[2])
+        if operator == 'not':
+            return ~self._evaluate(tree[1])
+        
+        field = tree[1]
+        values = tree[2] if operator == 'in' else [tree[2]]
+        labels = self._field(field)['labels']
+        if field == 'size':
+            values = np.asarray(values, dtype=labels.dtype)  # Compare at the stored float32 precision
+            compare = {'in': np.isin, '==': np.isin, '!=': lambda labels, values: ~np.isin(labels, values),
+                       '<': lambda labels, values: labels < values[0], '<=': lambda labels, values: labels <= values[0],
+                       '>': lambda labels, values: labels > values[0], '>=': lambda labels, values: labels >= values[0]}
+            return self._values_bitmap(field, compare[operator](labels, values))
+        lookup = self._field(field)['lookup']
+        selected = np.zeros(len(labels), dtype=bool)
+        selected[[lookup[value] for value in (canonicalize(field, value) for value in values) if value in lookup]] = True
+        return self._values_bitmap(field, ~selected if operator == '!=' else selected)
+    
+    def mask(self, expression):
+        """Returns a boolean array marking the rows that match a filter expression (see parse_filter)."""
+        tree = parse_filter(expression) if isinstance(expression, str) else expression
+        return np.unpackbits(self._evaluate(tree), count=self.row_count).view(bool)
+    
+    def count(self, expression):
+        """Returns the number of rows that match a filter expression."""
+        return int(np.count_nonzero(self.mask(expression)))
+    
+    def filter(self, expression):
+        """Returns a ShoeTable with the rows that match a filter expression."""
+        return self.shoes.take(self.mask(expression))
+
+class SharedShoeTable:
+    """A ShoeTable whose columns live in one shared-memory segment.
+    
+    The code arrays, the dictionaries (as UTF-8 bytes with offsets) and the
+    sizes are copied once into a multiprocessing.shared_memory segment.
+    Worker processes receive only the small, picklable handle and attach to
+    the segment, getting a ShoeTable whose code and size arrays are views
+    of the shared memory: nothing is pickled per worker and the columns are
+    held in memory once however many workers read them.
+    
+    The process that creates the segment owns it and must call close() when
+    the workers are done, which also frees the segment; attached copies only
+    unmap it.
+    """
+    
+    def __init__(self, segment, handle, owner):
+        """Use SharedShoeTable.create or SharedShoeTable.attach rather than calling this directly."""
+        self.segment = segment
+        self.handle = handle
+        self.owner = owner
+        self.table = self._view()
+    
+    @classmethod
+    def create(cls, data):
+        """Copies a ShoeTable (or a shoe DataFrame) into a new shared-memory segment."""
+        table = data if isinstance(data, ShoeTable) else ShoeTable.from_dataframe(data)
+        arrays = []
+        for field, codes in table.codes.items():
+            encoded = [str(value).encode('utf-8') for value in table.dictionaries[field]]
+            arrays.append(('codes', field, codes))
+            arrays.append(('offsets', field, np.cumsum([0] + [len(value) for value in encoded], dtype=np.int64)))
+            arrays.append(('text', field, np.frombuffer(b''.join(encoded), dtype=np.uint8)))
+        if table.sizes is not None:
+            arrays.append(('sizes', 'size', table.sizes))
+        
+        layout = []
+        offset = 0
+        for kind, field, column in arrays:
+            offset = -(-offset // SHARED_MEMORY_ALIGNMENT) * SHARED_MEMORY_ALIGNMENT
+            layout.append((kind, field, column.dtype.str, offset, len(column)))
+            offset += column.nbytes
+        segment = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for (kind, field, column), (_, _, dtype, start, length) in zip(arrays, layout):
+            np.ndarray(length, dtype=dtype, buffer=segment.buf, offset=start)[:] = column
+        return cls(segment, (segment.name, table.row_count, tuple(layout)), owner=True)
+    
+    @classmethod
+    def attach(cls, handle):
+        """Attaches to a segment created by SharedShoeTable.create, given its handle."""
+        return cls(shared_memory.SharedMemory(name=handle[0]), handle, owner=False)
+    
+    def _view(self):
+        """Builds a ShoeTable over the segment; only the dictionaries are decoded into Python strings."""
+        _, row_count, layout = self.handle
+        arrays = {(kind, field): np.ndarray(length, dtype=dtype, buffer=self.segment.buf, offset=start)
+                  for kind, field, dtype, start, length in layout}
+        codes = {field: column for (kind, field), column in arrays.items() if kind == 'codes'}
+        dictionaries = {}
+        for field in codes:
+            text = arrays['text', field].tobytes()
+            offsets = arrays['offsets', field]
+            dictionaries[field] = [text[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        return ShoeTable(codes, dictionaries, arrays.get(('sizes', 'size')), row_count=row_count)
+    
+    def close(self):
+        """Unmaps the segment, and frees it if this process created it. The table must no longer be used."""
+        if self.segment is None:
+            return
+        self.table = None  # The arrays view the mapping, which cannot be closed while they exist
+        self.segment.close()
+        if self.owner:
+            self.segment.unlink()
+        self.segment = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+_worker_shared_table = None  # The SharedShoeTable a pool worker attached to, see _attach_worker_table
+
+def _attach_worker_table(handle):
+    """Process-pool initializer: attaches the worker to the shared columns once, for all its tasks."""
+    global _worker_shared_table
+    _worker_shared_table = SharedShoeTable.attach(handle)
+
+def _call_with_worker_table(function, item):
+    """Runs one mapped task against the worker's attached table."""
+    return function(_worker_shared_table.table, item)
+
+def map_shared_table(function, data, items, workers=None):
+    """Applies function(table, item) to every item in a process pool sharing the table's columns.
+    
+    The columns are placed in shared memory once (unless data already is a
+    SharedShoeTable) and every worker attaches to them when it starts, so
+    tasks only pickle their item and result.
+    
+    Args:
+        function: Module-level function taking a ShoeTable and one item
+        data: ShoeTable, shoe DataFrame or SharedShoeTable to share
+        items: The items to map over
+        workers: Number of worker processes (defaults to the number of CPUs)
+    
+    Returns:
+        List of results, in the order of items
+    """
+    shared = data if isinstance(data, SharedShoeTable) else SharedShoeTable.create(data)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_worker_table,
+                                 initargs=(shared.handle,)) as executor:
+            return list(executor.map(partial(_call_with_worker_table, function), items))
+    finally:
+        if shared is not data:
+            shared.close()
+
+def _save_panels(shoes, job):
+    """Draws one set of panels with analyze_shoes and saves the figures. Returns the files written."""
+    panels, prefix = job
+    saved = []
+    for suffix, figure in zip(('charts', 'table'), analyze_shoes(shoes, save_figures=True, panels=panels) or ()):
+        if figure is not None:
+            filename = f"{prefix}_{suffix}.png"
+            figure.savefig(filename, dpi=300, bbox_inches='tight')
+            plt.close(figure)
+            saved.append(filename)
+    return saved
+
+def save_panels_in_workers(data, jobs, workers=None):
+    """Renders several panel selections in parallel worker processes sharing the same columns.
+    
+    Args:
+        data: ShoeTable, shoe DataFrame or SharedShoeTable to draw from
+        jobs: List of (panels, prefix) pairs; each writes <prefix>_charts.png
+            and, if it includes 'inventory', <prefix>_table.png
+        workers: Number of worker processes (defaults to the number of CPUs)
+    
+    Returns:
+        List with the files written by each job
+    """
+    for panels, _ in jobs:
+        columns_for_panels(panels)  # Rejects unknown panel names before starting any worker
+    return map_shared_table(_save_panels, data, jobs, workers=workers)
+
+def columns_for_panels(panels):
+    """Lists the shoe fields needed to draw the given panels, in SHOE_FIELDS order."""
+    unknown = [panel for panel in panels if panel not in PANEL_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown panel(s): {', '.join(unknown)}. Choose from: {', '.join(PANEL_COLUMNS)}")
+    needed = {field for panel in panels for field in PANEL_COLUMNS[panel]}
+    return [field for field in SHOE_FIELDS if field in needed]
+
+def analyze_shoes(data, save_figures=False, panels=None, brand_capacity=None, kde_fft_min_rows=KDE_FFT_MIN_ROWS,
+                  where=None):
     """Analyzes shoe data and creates visualizations.
     
+    The charts are drawn from a CollectionSummary, computed in one pass over
+    the data unless a summary is given; pandas and seaborn are only used to
+    draw them. An Arrow table is converted without copying its columns.
+    
     Args:
-        df: DataFrame containing shoe data
+        data: DataFrame, ShoeTable or Arrow table containing shoe data, or a
+            CollectionSummary (which cannot draw the inventory table)
         save_figures: If True, figures will be saved without displaying them
+        panels: Names from PANEL_COLUMNS to draw (default: all). The data only
+            needs the columns those panels use.
+        brand_capacity: If given, brands are counted approximately, tracking
+            only this many (see BrandHeavyHitters); the brand chart then shows
+            the error bound of each count
+        kde_fft_min_rows: Number of shoes from which the size histogram's
+            density curve is computed with binned_kde instead of seaborn
+        where: Optional filter expression (see parse_filter) selecting the
+            shoes to draw. A ShoeTable keeps its index between calls, so
+            drawing many segments of one table does not rescan its columns.
+    
+    Returns:
+        (charts figure, inventory table figure); either is None if none of
+        its panels were requested
     """
-    if df.empty:
+    if len(data) == 0:
         print("No shoe data available for analysis.")
         return
+    panels = list(PANEL_COLUMNS) if panels is None else panels
+    if isinstance(data, CollectionSummary):
+        if where is not None:
+            raise ValueError("A summary cannot be filtered; filter the shoes before summarizing them")
+        if 'inventory' in panels:
+            raise ValueError("The inventory table needs the shoes themselves, not a summary of them")
+        shoes = None
+        summary = data
+    else:
+        if isinstance(data, ShoeTable):
+            shoes = data
+        elif pa is not None and isinstance(data, pa.Table):
+            shoes = ShoeTable.from_arrow(data)
+        else:
+            shoes = ShoeTable.from_dataframe(data)
+        if where is not None:
+            shoes = shoes.filter(where)
+            if len(shoes) == 0:
+                print(f"No shoes match the filter: {where}")
+                return
+        summary = CollectionSummary.from_table(shoes, brand_capacity=brand_capacity)
+    total_label = f'Total Shoes: {summary.total}' + (f' (where {where})' if where is not None else '')
+    missing = [field for field in columns_for_panels(panels) if field not in (shoes or summary).columns]
+    if missing:
+        raise ValueError(f"The requested panels need columns that were not loaded: {', '.join(missing)}")
     
     # Set up the plotting style - modern, clean look
     plt.style.use('seaborn-v0_8-whitegrid')
@@ -137,234 +1509,403 @@ def analyze_shoes(df, save_figures=False):
     pie_colors = ['#4472C4', '#ED7D31', '#A5A5A5', '#FFC000', '#5B9BD5', '#70AD47', '#F15C80', '#9B59B6', '#3498DB', '#2ECC71', 
                  '#8E44AD', '#F39C12', '#D35400', '#C0392B', '#BDC3C7', '#1ABC9C']  # More colors for pie chart
     
-    # Create a figure with subplots
-    fig = plt.figure(figsize=(18, 14))
-    fig.patch.set_facecolor('#F5F5F5')  # Light grey background
-    
-    # Add a stylish title
-    fig.suptitle('Shoe Collection Analysis', fontsize=22, fontweight='bold', y=0.98, color='#303030')
-    plt.figtext(0.5, 0.94, f'Total Shoes: {len(df)}', ha='center', fontsize=14, fontstyle='italic', color='#505050')
-    
-    # Create subplots with spacing
-    gs = fig.add_gridspec(2, 3, hspace=0.35, wspace=0.3)
-    
-    # 1. Color Distribution (Pie Chart)
-    ax1 = fig.add_subplot(gs[0, 0])
-    color_counts = df['color'].value_counts()
-    wedges, texts, autotexts = ax1.pie(
-        color_counts, 
-        labels=None,  # No labels on the pie directly
-        autopct='%1.1f%%', 
-        startangle=90,
-        colors=pie_colors,
-        wedgeprops={'width': 0.6, 'edgecolor': 'w', 'linewidth': 2},  # Donut chart style
-        textprops={'fontsize': 10, 'color': 'white', 'fontweight': 'bold'}
-    )
-    # Draw a white circle at the center to create a donut chart
-    centre_circle = plt.Circle((0, 0), 0.3, fc='white')
-    ax1.add_patch(centre_circle)
-    
-    # Add legend outside the pie
-    ax1.legend(wedges, color_counts.index, title="Colors", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
-    
-    ax1.set_title('Distribution of Shoe Colors', fontsize=14, fontweight='bold', pad=20, color='#303030')
-    ax1.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
-    
-    # 2. Usage Distribution (Bar Chart)
-    ax2 = fig.add_subplot(gs[0, 1])
-    usage_counts = df['usage'].value_counts()
-    
-    # Fixed version for modern seaborn - use hue parameter instead of directly passing palette
-    bars = sns.barplot(x=usage_counts.index, y=usage_counts.values, hue=usage_counts.index, 
-                      ax=ax2, palette=colors[:len(usage_counts)], legend=False)
-    
-    # Add value labels on top of bars
-    for i, bar in enumerate(bars.containers[0]):
-        bars.text(
-            bar.get_x() + bar.get_width()/2.,
-            bar.get_height() + 0.3,
-            f'{int(usage_counts.values[i])}',
-            ha="center", va="bottom", fontsize=11, fontweight='bold', color='#505050'
-        )
-    
-    ax2.set_title('Shoes by Usage Type', fontsize=14, fontweight='bold', pad=20, color='#303030')
-    ax2.set_xlabel('Usage', fontsize=12, color='#505050')
-    ax2.set_ylabel('Count', fontsize=12, color='#505050')
-    plt.setp(ax2.get_xticklabels(), rotation=0, ha='center')
-    
-    # Style the grid
-    ax2.grid(axis='y', linestyle='--', alpha=0.7)
+    # Create a figure with one subplot per requested chart, three to a row
+    chart_panels = [panel for panel in CHART_PANELS if panel in panels]
+    fig = None
+    if chart_panels:
+        rows = (len(chart_panels) + 2) // 3
+        height = 7 * rows
+        fig = plt.figure(figsize=(18, height))
+        fig.patch.set_facecolor('#F5F5F5')  # Light grey background
+        
+        # Add a stylish title, kept the same distance (in inches) from the top whatever the height
+        fig.suptitle('Shoe Collection Analysis', fontsize=22, fontweight='bold', y=1 - 0.28 / height, color='#303030')
+        plt.figtext(0.5, 1 - 0.84 / height, total_label, ha='center', fontsize=14, fontstyle='italic', color='#505050')
+        
+        # Create subplots with spacing, leaving fixed margins (in inches) for the titles and rotated labels
+        gs = fig.add_gridspec(rows, min(len(chart_panels), 3), hspace=0.35, wspace=0.3,
+                              top=1 - 1.68 / height, bottom=1.54 / height)
+        slots = {panel: gs[i // 3, i % 3] for i, panel in enumerate(chart_panels)}
+    else:
+        slots = {}
     
-    # 3. Size Distribution (Histogram) - Fixed for modern seaborn
-    ax3 = fig.add_subplot(gs[0, 2])
-    sns.histplot(df, x='size', bins=10, kde=True, ax=ax3, color=colors[0], line_kws={'color': colors[1], 'linewidth': 2})
+    if 'colors' in slots:
+        # 1. Color Distribution (Pie Chart)
+        ax1 = fig.add_subplot(slots['colors'])
+        color_names, color_counts = summary.most_common('color')
+        wedges, texts, autotexts = ax1.pie(
+            color_counts, 
+            labels=None,  # No labels on the pie directly
+            autopct='%1.1f%%', 
+            startangle=90,
+            colors=pie_colors,
+            wedgeprops={'width': 0.6, 'edgecolor': 'w', 'linewidth': 2},  # Donut chart style
+            textprops={'fontsize': 10, 'color': 'white', 'fontweight': 'bold'}
+        )
+        # Draw a white circle at the center to create a donut chart
+        centre_circle = plt.Circle((0, 0), 0.3, fc='white')
+        ax1.add_patch(centre_circle)
+        
+        # Add legend outside the pie
+        ax1.legend(wedges, color_names, title="Colors", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
+        
+        ax1.set_title('Distribution of Shoe Colors', fontsize=14, fontweight='bold', pad=20, color='#303030')
+        ax1.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
     
-    ax3.set_title('Distribution of Shoe Sizes', fontsize=14, fontweight='bold', pad=20, color='#303030')
-    ax3.set_xlabel('Size', fontsize=12, color='#505050')
-    ax3.set_ylabel('Count', fontsize=12, color='#505050')
+    if 'usage' in slots:
+        # 2. Usage Distribution (Bar Chart)
+        ax2 = fig.add_subplot(slots['usage'])
+        usage_names, usage_counts = summary.most_common('usage')
+        
+        # Fixed version for modern seaborn - use hue parameter instead of directly passing palette
+        bars = sns.barplot(x=usage_names, y=usage_counts, hue=usage_names, 
+                          ax=ax2, palette=colors[:len(usage_counts)], legend=False)
+        
+        # Add value labels on top of bars
+        for i, bar in enumerate(bars.containers[0]):
+            bars.text(
+                bar.get_x() + bar.get_width()/2.,
+                bar.get_height() + 0.3,
+                f'{int(usage_counts[i])}',
+                ha="center", va="bottom", fontsize=11, fontweight='bold', color='#505050'
+            )
+        
+        ax2.set_title('Shoes by Usage Type', fontsize=14, fontweight='bold', pad=20, color='#303030')
+        ax2.set_xlabel('Usage', fontsize=12, color='#505050')
+        ax2.set_ylabel('Count', fontsize=12, color='#505050')
+        plt.setp(ax2.get_xticklabels(), rotation=0, ha='center')
+        
+        # Style the grid
+        ax2.grid(axis='y', linestyle='--', alpha=0.7)
     
-    # Style the grid
-    ax3.grid(axis='y', linestyle='--', alpha=0.7)
+    if 'sizes' in slots:
+        # 3. Size Distribution (Histogram) - Fixed for modern seaborn
+        ax3 = fig.add_subplot(slots['sizes'])
+        sizes, size_counts = summary.size_counts
+        if summary.total >= kde_fft_min_rows:
+            # Draw the histogram alone and add the density curve from the binned FFT estimate, scaled to
+            # the bars and evaluated over the data range as seaborn does
+            sns.histplot(x=sizes, weights=size_counts, bins=10, ax=ax3, color=colors[0])
+            if len(sizes) > 1:
+                support = np.linspace(sizes.min(), sizes.max(), 200)
+                density = binned_kde(sizes, size_counts, support, kde_bandwidth(sizes, size_counts))
+                bin_width = np.diff(np.histogram_bin_edges(sizes, bins=10))[0]
+                ax3.plot(support, density * size_counts.sum() * bin_width, color=colors[1], linewidth=2)
+        else:
+            # Expand the counts back to one value per shoe, which is cheap below the threshold and gives the
+            # same density curve as the rows themselves; weighted values would change seaborn's bandwidth
+            sns.histplot(x=np.repeat(sizes, size_counts), bins=10, kde=True, ax=ax3, color=colors[0],
+                         line_kws={'color': colors[1], 'linewidth': 2})
+        
+        ax3.set_title('Distribution of Shoe Sizes', fontsize=14, fontweight='bold', pad=20, color='#303030')
+        ax3.set_xlabel('Size', fontsize=12, color='#505050')
+        ax3.set_ylabel('Count', fontsize=12, color='#505050')
+        
+        # Style the grid
+        ax3.grid(axis='y', linestyle='--', alpha=0.7)
     
-    # 4. Brand Distribution (Bar Chart)
-    ax4 = fig.add_subplot(gs[1, 0])
-    brand_counts = df['brand'].value_counts().head(8)  # Top 8 brands
+    if 'brands' in slots:
+        # 4. Brand Distribution (Bar Chart)
+        ax4 = fig.add_subplot(slots['brands'])
+        brand_names, brand_counts = summary.most_common('brand', 8)  # Top 8 brands
+        
+        # Fixed version for modern seaborn
+        bars = sns.barplot(x=brand_names, y=brand_counts, hue=brand_names,
+                          ax=ax4, palette=colors[:len(brand_counts)], legend=False)
+        
+        # Add value labels on top of bars
+        for i, bar in enumerate(bars.containers[0]):
+            bars.text(
+                bar.get_x() + bar.get_width()/2.,
+                bar.get_height() + 0.3,
+                f'{int(brand_counts[i])}',
+                ha="center", va="bottom", fontsize=11, fontweight='bold', color='#505050'
+            )
+        # Approximate counts may overestimate by up to their error, so show how far each could drop
+        brand_errors = summary.brand_errors(8)
+        if brand_errors.any():
+            ax4.errorbar(range(len(brand_counts)), brand_counts, yerr=[brand_errors, np.zeros_like(brand_errors)],
+                         fmt='none', ecolor='#303030', capsize=4)
+        
+        ax4.set_title('Top Brands in Collection', fontsize=14, fontweight='bold', pad=20, color='#303030')
+        ax4.set_xlabel('Brand', fontsize=12, color='#505050')
+        ax4.set_ylabel('Count', fontsize=12, color='#505050')
+        plt.setp(ax4.get_xticklabels(), rotation=45, ha='right')
+        
+        # Style the grid
+        ax4.grid(axis='y', linestyle='--', alpha=0.7)
     
-    # Fixed version for modern seaborn
-    bars = sns.barplot(x=brand_counts.index, y=brand_counts.values, hue=brand_counts.index,
-                      ax=ax4, palette=colors[:len(brand_counts)], legend=False)
+    if 'brand_usage' in slots:
+        # 5. Brand vs Usage (Stacked Bar Chart)
+        ax5 = fig.add_subplot(slots['brand_usage'])
+        # The brand vs usage crosstab of the top 8 brands
+        brands, usages, counts = summary.top_brand_usage(8)
+        brand_usage = pd.DataFrame(counts, index=pd.Index(brands, name='brand'), columns=pd.Index(usages, name='usage'))
+        brand_usage.plot(
+            kind='bar', 
+            stacked=True, 
+            ax=ax5, 
+            colormap='tab10',
+            width=0.8
+        )
+        ax5.set_title('Brand by Usage Type', fontsize=14, fontweight='bold', pad=20, color='#303030')
+        ax5.set_xlabel('Brand', fontsize=12, color='#505050')
+        ax5.set_ylabel('Count', fontsize=12, color='#505050')
+        plt.setp(ax5.get_xticklabels(), rotation=45, ha='right')
+        
+        # Style the grid
+        ax5.grid(axis='y', linestyle='--', alpha=0.7)
+        # Improve legend
+        ax5.legend(title='Usage Type', frameon=True, edgecolor='#D3D3D3')
     
-    # Add value labels on top of bars
-    for i, bar in enumerate(bars.containers[0]):
-        bars.text(
-            bar.get_x() + bar.get_width()/2.,
-            bar.get_height() + 0.3,
-            f'{int(brand_counts.values[i])}',
-            ha="center", va="bottom", fontsize=11, fontweight='bold', color='#505050'
+    if 'size_by_color' in slots:
+        # 6. Color vs Size boxplot
+        ax6 = fig.add_subplot(slots['size_by_color'])
+        # Draw the boxes from precomputed statistics, styled the way sns.boxplot styles them
+        box_stats = summary.size_box_stats()  # One box per color actually present
+        box_colors = [sns.desaturate(color, 0.75) for color in pie_colors[:len(box_stats)]]
+        line_color = (min(colorsys.rgb_to_hls(*mcolors.to_rgb(color))[1] for color in box_colors) * 0.6,) * 3
+        boxes = ax6.bxp(
+            box_stats,
+            positions=range(len(box_stats)),
+            widths=0.6,
+            capwidths=0.3,
+            patch_artist=True,
+            manage_ticks=False,
+            boxprops={'edgecolor': line_color},
+            medianprops={'color': line_color, 'solid_capstyle': 'butt'},
+            whiskerprops={'color': line_color, 'solid_capstyle': 'butt'},
+            capprops={'color': line_color},
+            flierprops={'marker': 'o', 'markerfacecolor': 'red', 'markeredgecolor': line_color, 'markersize': 6},
         )
+        for box, box_color in zip(boxes['boxes'], box_colors):
+            box.set_facecolor(box_color)
+        ax6.set_xticks(range(len(box_stats)), [stats['label'] for stats in box_stats])
+        ax6.set_xlim(-0.5, len(box_stats) - 0.5)
+        ax6.xaxis.grid(False)
+        ax6.set_title('Shoe Sizes by Color', fontsize=14, fontweight='bold', pad=20, color='#303030')
+        ax6.set_xlabel('Color', fontsize=12, color='#505050')
+        ax6.set_ylabel('Size', fontsize=12, color='#505050')
+        plt.setp(ax6.get_xticklabels(), rotation=45, ha='right')
+        
+        # Style the grid
+        ax6.grid(axis='y', linestyle='--', alpha=0.7)
     
-    ax4.set_title('Top Brands in Collection', fontsize=14, fontweight='bold', pad=20, color='#303030')
-    ax4.set_xlabel('Brand', fontsize=12, color='#505050')
-    ax4.set_ylabel('Count', fontsize=12, color='#505050')
-    plt.setp(ax4.get_xticklabels(), rotation=45, ha='right')
-    
-    # Style the grid
-    ax4.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # 5. Brand vs Usage (Stacked Bar Chart)
-    ax5 = fig.add_subplot(gs[1, 1])
-    # Create a crosstab for brand vs usage
-    brand_usage = pd.crosstab(df['brand'], df['usage'])
-    brand_usage = brand_usage.loc[brand_usage.sum(axis=1).sort_values(ascending=False).head(8).index]  # Top 8 brands
-    brand_usage.plot(
-        kind='bar', 
-        stacked=True, 
-        ax=ax5, 
-        colormap='tab10',
-        width=0.8
-    )
-    ax5.set_title('Brand by Usage Type', fontsize=14, fontweight='bold', pad=20, color='#303030')
-    ax5.set_xlabel('Brand', fontsize=12, color='#505050')
-    ax5.set_ylabel('Count', fontsize=12, color='#505050')
-    plt.setp(ax5.get_xticklabels(), rotation=45, ha='right')
-    
-    # Style the grid
-    ax5.grid(axis='y', linestyle='--', alpha=0.7)
-    # Improve legend
-    ax5.legend(title='Usage Type', frameon=True, edgecolor='#D3D3D3')
-    
-    # 6. Color vs Size boxplot
-    ax6 = fig.add_subplot(gs[1, 2])
-    sns.boxplot(
-        x='color', 
-        y='size', 
-        data=df, 
-        hue='color',  # Fixed for modern seaborn
-        ax=ax6, 
-        palette=pie_colors[:len(df['color'].unique())],
-        width=0.6,
-        flierprops={'marker': 'o', 'markerfacecolor': 'red', 'markersize': 6},
-        legend=False  # Hide the legend since it's redundant with x-axis
-    )
-    ax6.set_title('Shoe Sizes by Color', fontsize=14, fontweight='bold', pad=20, color='#303030')
-    ax6.set_xlabel('Color', fontsize=12, color='#505050')
-    ax6.set_ylabel('Size', fontsize=12, color='#505050')
-    plt.setp(ax6.get_xticklabels(), rotation=45, ha='right')
-    
-    # Style the grid
-    ax6.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # Add a watermark signature
-    fig.text(0.99, 0.01, 'Shoe Collection Analyzer', 
-             ha='right', va='bottom', alpha=0.1, fontsize=20, fontweight='bold')
-    
-    # Adjust layout for the plots
-    plt.tight_layout(rect=[0, 0, 1, 0.93])
+    if fig is not None:
+        # Add a watermark signature
+        fig.text(0.99, 0.01, 'Shoe Collection Analyzer', 
+                 ha='right', va='bottom', alpha=0.1, fontsize=20, fontweight='bold')
+        
+        # Adjust layout for the plots
+        plt.tight_layout(rect=[0, 0, 1, 1 - 0.98 / height])
     
     # Create a styled table in a separate figure
-    table_fig = plt.figure(figsize=(18, 8))
-    table_fig.patch.set_facecolor('#F5F5F5')  # Light grey background
-    
-    # Add a stylish title
-    table_fig.suptitle('Shoe Collection Inventory', fontsize=22, fontweight='bold', color='#303030')
-    plt.figtext(0.5, 0.95, f'Total Shoes: {len(df)}', ha='center', fontsize=14, fontstyle='italic', color='#505050')
-    
-    # Format the table
-    table_ax = plt.subplot(1, 1, 1)
-    table_ax.axis('off')  # Hide the axes
-    
-    # Create a styled table
-    cell_text = []
-    for _, row in df.iterrows():
-        cell_text.append([row['brand'], row['name'], row['color'], row['usage'], str(row['size'])])
-        
-    column_labels = ['Brand', 'Name', 'Color', 'Usage', 'Size']
-    
-    # Calculate optimal column widths
-    col_widths = [0.2, 0.25, 0.2, 0.15, 0.1]
-    
-    # Create the table with a more modern look
-    table = plt.table(
-        cellText=cell_text,
-        colLabels=column_labels,
-        colWidths=col_widths,
-        loc='center',
-        cellLoc='center',
-        bbox=[0.05, 0.05, 0.9, 0.85]  # Position the table properly
-    )
-    
-    # Style the table
-    table.auto_set_font_size(False)
-    table.set_fontsize(10)
-    table.scale(1, 1.5)  # Adjust row height
-    
-    # Style the header and rows with a modern color scheme
-    header_color = '#4472C4'  # Blue header
-    odd_row_color = '#EDF2F9'  # Very light blue for odd rows
-    even_row_color = '#FFFFFF'  # White for even rows
-    border_color = '#FFFFFF'  # White borders
-    
-    for (row, col), cell in table.get_celld().items():
-        # Set cell edge color
-        cell.set_edgecolor(border_color)
-        
-        if row == 0:  # Header row
-            cell.set_text_props(weight='bold', color='white')
-            cell.set_facecolor(header_color)
-        else:  # Alternate row colors for better readability
-            if row % 2:
-                cell.set_facecolor(odd_row_color)
-            else:
-                cell.set_facecolor(even_row_color)
-    
-    plt.tight_layout(rect=[0, 0, 1, 0.94])
+    table_fig = None
+    if 'inventory' in panels:
+        table_fig = plt.figure(figsize=(18, 8))
+        table_fig.patch.set_facecolor('#F5F5F5')  # Light grey background
+        
+        # Add a stylish title
+        table_fig.suptitle('Shoe Collection Inventory', fontsize=22, fontweight='bold', color='#303030')
+        plt.figtext(0.5, 0.95, total_label, ha='center', fontsize=14, fontstyle='italic', color='#505050')
+        
+        # Format the table
+        table_ax = plt.subplot(1, 1, 1)
+        table_ax.axis('off')  # Hide the axes
+        
+        # Create a styled table
+        cell_text = []
+        for shoe in shoes.rows():
+            cell_text.append([shoe.brand, shoe.name, shoe.color, shoe.usage, str(shoe.size)])
+        
+        column_labels = ['Brand', 'Name', 'Color', 'Usage', 'Size']
+        
+        # Calculate optimal column widths
+        col_widths = [0.2, 0.25, 0.2, 0.15, 0.1]
+        
+        # Create the table with a more modern look
+        table = plt.table(
+            cellText=cell_text,
+            colLabels=column_labels,
+            colWidths=col_widths,
+            loc='center',
+            cellLoc='center',
+            bbox=[0.05, 0.05, 0.9, 0.85]  # Position the table properly
+        )
+        
+        # Style the table
+        table.auto_set_font_size(False)
+        table.set_fontsize(10)
+        table.scale(1, 1.5)  # Adjust row height
+        
+        # Style the header and rows with a modern color scheme
+        header_color = '#4472C4'  # Blue header
+        odd_row_color = '#EDF2F9'  # Very light blue for odd rows
+        even_row_color = '#FFFFFF'  # White for even rows
+        border_color = '#FFFFFF'  # White borders
+        
+        for (row, col), cell in table.get_celld().items():
+            # Set cell edge color
+            cell.set_edgecolor(border_color)
+            
+            if row == 0:  # Header row
+                cell.set_text_props(weight='bold', color='white')
+                cell.set_facecolor(header_color)
+            else:  # Alternate row colors for better readability
+                if row % 2:
+                    cell.set_facecolor(odd_row_color)
+                else:
+                    cell.set_facecolor(even_row_color)
+        
+        plt.tight_layout(rect=[0, 0, 1, 0.94])
     
     # Show both figures (unless we're just saving)
     if not save_figures:
         plt.show()
     return fig, table_fig  # Return the figures for saving
 
-def main():
+def parse_args(argv=None):
+    """Parses command-line options. With no options the program runs interactively."""
+    parser = argparse.ArgumentParser(description="Analyze a shoe collection and visualize it.")
+    parser.add_argument('--batch', metavar='PATH_OR_GLOB',
+                        help="read every file in a directory or matching a glob, in parallel, and analyze them together")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes used by --batch and to parse large data files (default: number of CPUs)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="treat the data file read interactively as an append-only log and parse only the lines added "
+                             "since the last run")
+    parser.add_argument('--rejects', metavar='CSV_FILE',
+                        help="write every line that failed validation to this file, with its line number and reason")
+    parser.add_argument('--aliases', metavar='CSV_FILE',
+                        help="load extra alias spellings (lines of Field,Alias,Canonical) used to merge brand, color, name and usage values")
+    parser.add_argument('--arrow', metavar='ARROW_FILE',
+                        help="also save the inventory as an Arrow IPC (Feather) file for other Arrow-based tools")
+    parser.add_argument('--summary-out', metavar='JSON_FILE',
+                        help="also save the collection summary (the counts the charts are drawn from) for merging later")
+    parser.add_argument('--summary-only', action='store_true',
+                        help="summarize --batch files in their workers, or piped input batch by batch, and draw only the charts")
+    parser.add_argument('--merge-summaries', metavar='PATH_OR_GLOB',
+                        help="merge summaries saved with --summary-out and draw the charts of the combined collection")
+    parser.add_argument('--crosstab', metavar='FIELDS', action='append', default=[],
+                        help="print the counts for a comma-separated list of fields, e.g. color,usage (from brand, color, usage "
+                             "and size); may be repeated")
+    parser.add_argument('--filter', metavar='EXPRESSION',
+                        help="analyze only the shoes matching an expression, e.g. "
+                             "\"brand in {Nike, Adidas} and usage == Athletic and size >= 10\"")
+    parser.add_argument('--brand-capacity', type=int, metavar='N',
+                        help="count brands approximately, tracking only the N most common, for collections with very many brands")
+    parser.add_argument('--panels', metavar='PANELS',
+                        help=f"draw only a comma-separated list of outputs (from {', '.join(PANEL_COLUMNS)}); a data file "
+                             "read interactively is then memory-mapped and only the columns those outputs need are parsed")
+    args = parser.parse_args(argv)
+    if args.brand_capacity is not None and args.brand_capacity < 1:
+        parser.error("--brand-capacity must be at least 1")
+    if args.filter is not None:
+        if args.summary_only or args.merge_summaries:
+            parser.error("--filter cannot be combined with --summary-only or --merge-summaries")
+        try:
+            parse_filter(args.filter)
+        except ValueError as e:
+            parser.error(f"--filter: {e}")
+    args.crosstab = [[field.strip().lower() for field in fields.split(',')] for fields in args.crosstab]
+    for fields in args.crosstab:
+        unknown = [field for field in fields if field not in CUBE_FIELDS]
+        if unknown:
+            parser.error(f"--crosstab: unknown field(s) {', '.join(unknown)}; choose from {', '.join(CUBE_FIELDS)}")
+    if args.panels is not None:
+        args.panels = [panel.strip().lower() for panel in args.panels.split(',')]
+        try:
+            columns_for_panels(args.panels)
+        except ValueError as e:
+            parser.error(f"--panels: {e}")
+        if 'inventory' in args.panels and (args.summary_only or args.merge_summaries):
+            parser.error("--panels: the inventory table cannot be drawn with --summary-only or --merge-summaries")
+        if args.crosstab or args.filter is not None:
+            parser.error("--panels cannot be combined with --crosstab or --filter, which may need columns the panels do not")
+    if args.merge_summaries and args.batch:
+        parser.error("--merge-summaries cannot be combined with --batch")
+    if args.incremental and (args.batch or args.summary_only or args.merge_summaries):
+        parser.error("--incremental applies to a single data file and cannot be combined with --batch, --summary-only "
+                     "or --merge-summaries")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
     print("=== Shoe Collection Analyzer ===")
+    diagnostics = ParseDiagnostics(args.rejects)
+    if args.aliases and not load_aliases(args.aliases):
+        print("Exiting program.")
+        return
+    # Check if we're in piped (or batch) mode; decided up front because reading piped input closes stdin
+    is_piped_input = not sys.stdin.isatty() or args.batch is not None
+    if args.incremental and is_piped_input:
+        # Piped input has no file to keep a watermark for
+        print("--incremental needs a data file, not piped input. Exiting program.")
+        return
     
+    if args.merge_summaries or args.summary_only:
+        # Only summaries are combined, so only the charts can be drawn
+        if args.merge_summaries:
+            paths = _expand_shoe_sources(args.merge_summaries)
+            print(f"Merging {len(paths)} summaries from '{args.merge_summaries}'...")
+            summaries = [summary for summary in map(load_summary, paths) if summary is not None]
+            if args.brand_capacity is not None:
+                summaries = [summary.with_brand_capacity(args.brand_capacity) for summary in summaries]
+            summary = merge_summaries(summaries)
+        elif args.batch:
+            print(f"Summarizing shoe data from '{args.batch}'...")
+            summary = summarize_shoe_batch(args.batch, workers=args.workers, brand_capacity=args.brand_capacity,
+                                           diagnostics=diagnostics)
+        elif is_piped_input:
+            print("Summarizing piped input...")
+            diagnostics.source = '<stdin>'
+            try:
+                summary = summarize_shoe_stream(open_shoe_source(sys.stdin.buffer), brand_capacity=args.brand_capacity,
+                                                diagnostics=diagnostics)
+            except Exception as e:
+                print(f"An error occurred while reading the piped input: {e}")
+                summary = None
+            finally:
+                diagnostics.report("piped input")
+        else:
+            print("--summary-only needs --batch or piped input. Exiting program.")
+            return
+        
+        if summary is None:
+            print("No valid summaries found. Exiting program.")
+            return
+        if args.summary_out:
+            save_summary(summary, args.summary_out)
+        
+        print("\nAnalyzing your shoe collection...")
+        charts_fig, _ = analyze_shoes(summary, save_figures=True, panels=args.panels or CHART_PANELS)
+        charts_fig.savefig("shoe_collection_charts.png", dpi=300, bbox_inches='tight')
+        print("Charts saved to 'shoe_collection_charts.png'")
+        print("Thank you for using the Shoe Collection Analyzer!")
+        return
+    
+    if args.batch:
+        print(f"Reading shoe data from '{args.batch}'...")
+        df = read_shoe_data_batch(args.batch, workers=args.workers, diagnostics=diagnostics)
+        
+        if df is None:
+            print("No valid data found in the batch. Exiting program.")
+            return
     # Check if the program is receiving piped input
-    if not sys.stdin.isatty():
+    elif is_piped_input:
         print("Detecting piped input...")
-        # Create a temporary file for the piped input
-        temp_filename = "temp_shoe_data.txt"
-        with open(temp_filename, 'w') as temp_file:
-            temp_file.write(sys.stdin.read())
-        
         print(f"Reading shoe data from piped input...")
-        shoes = read_shoe_data_from_file(temp_filename)
-        
-        # Clean up the temporary file
+        # Parse stdin as it arrives rather than spooling it to disk first
+        diagnostics.source = '<stdin>'
         try:
-            os.remove(temp_filename)
-        except:
-            pass
+            df = read_shoe_dataframe_from_stream(open_shoe_source(sys.stdin.buffer), diagnostics=diagnostics)
+        except Exception as e:
+            print(f"An error occurred while reading the piped input: {e}")
+            df = None
+        finally:
+            diagnostics.report("piped input")
             
-        if shoes is None or len(shoes) == 0:
+        if df is None or df.empty:
             print("No valid data found in the piped input. Exiting program.")
             return
     else:
@@ -378,14 +1919,20 @@ def main():
         choice = input("\nEnter your choice (1-3): ").strip()
         
         if choice == '1':
-            shoes = get_shoe_data()
+            df = create_dataframe(get_shoe_data())
         elif choice == '2':
             filename = input("Enter the path to your shoe data file: ").strip()
-            shoes = read_shoe_data_from_file(filename)
-            if shoes is None:
+            if args.incremental:
+                df = read_shoe_data_incrementally(filename, diagnostics=diagnostics)
+            elif args.panels is not None:
+                # Decode only the columns the requested outputs need, straight from the mapped file
+                df = read_shoe_columns_mmap(filename, diagnostics=diagnostics, columns=columns_for_panels(args.panels))
+            else:
+                df = read_shoe_columns_cached(filename, diagnostics=diagnostics, workers=args.workers)
+            if df is None:
                 print("Would you like to enter data manually instead? (y/n): ")
                 if input().lower() == 'y':
-                    shoes = get_shoe_data()
+                    df = create_dataframe(get_shoe_data())
                 else:
                     print("Exiting program.")
                     return
@@ -396,7 +1943,7 @@ def main():
             create_template_file(filename)
             print("Would you like to enter data manually now? (y/n): ")
             if input().lower() == 'y':
-                shoes = get_shoe_data()
+                df = create_dataframe(get_shoe_data())
             else:
                 print("Exiting program.")
                 return
@@ -404,16 +1951,28 @@ def main():
             print("Invalid choice. Exiting program.")
             return
     
-    df = create_dataframe(shoes)
-    
-    # Check if we're in piped mode
-    is_piped_input = not sys.stdin.isatty()
+    if args.filter is not None:
+        # Every output below covers only the selected shoes; indexing the DataFrame keeps --batch's source column
+        df = df[ShoeTable.from_dataframe(df).index().mask(args.filter)].reset_index(drop=True)
+        print(f"{len(df)} shoes match the filter: {args.filter}")
+        if df.empty:
+            print("Exiting program.")
+            return
     
     print("\nAnalyzing your shoe collection...")
-    charts_fig, table_fig = analyze_shoes(df, save_figures=is_piped_input)
+    charts_fig, table_fig = analyze_shoes(df, save_figures=is_piped_input, panels=args.panels,
+                                          brand_capacity=args.brand_capacity)
     
-    # Check if we're in piped mode to avoid EOF error
-    is_piped_input = not sys.stdin.isatty()
+    if args.arrow:
+        save_shoe_arrow(df, args.arrow)
+    if args.summary_out:
+        save_summary(CollectionSummary.from_table(df, brand_capacity=args.brand_capacity), args.summary_out)
+    if args.crosstab:
+        # Count every combination once; each requested table is then a sum over the cube
+        cube = ShoeCube.from_table(df)
+        for fields in args.crosstab:
+            print(f"\nShoes by {' and '.join(fields)}:")
+            print((cube.crosstab(*fields) if len(fields) == 2 else cube.value_counts(*fields)).to_string())
     
     if is_piped_input:
         # When using piped input, automatically save files without prompting
@@ -424,12 +1983,14 @@ def main():
         
         # Save figures automatically
         print("Saving visualization figures...")
-        # Save the figures using the references we have
-        charts_fig.savefig("shoe_collection_charts.png", dpi=300, bbox_inches='tight')
-        print("Charts saved to 'shoe_collection_charts.png'")
+        # Save the figures using the references we have; --panels may leave either one out
+        if charts_fig is not None:
+            charts_fig.savefig("shoe_collection_charts.png", dpi=300, bbox_inches='tight')
+            print("Charts saved to 'shoe_collection_charts.png'")
         
-        table_fig.savefig("shoe_collection_table.png", dpi=300, bbox_inches='tight')
-        print("Table saved to 'shoe_collection_table.png'")
+        if table_fig is not None:
+            table_fig.savefig("shoe_collection_table.png", dpi=300, bbox_inches='tight')
+            print("Table saved to 'shoe_collection_table.png'")
         
         print("Figure display complete.")
     else:
@@ -448,7 +2009,7 @@ def main():
             
             # Save figures (optional)
             save_figs = input("\nWould you like to save the visualization figures? (y/n): ").lower()
-            if save_figs == 'y':
+            if save_figs == 'y' and charts_fig is not None:
                 charts_filename = input("Enter filename for charts (default: shoe_collection_charts.png): ").strip()
                 if not charts_filename:
                     charts_filename = "shoe_collection_charts.png"
@@ -458,7 +2019,8 @@ def main():
                 # Save charts using the figure reference
                 charts_fig.savefig(charts_filename, dpi=300, bbox_inches='tight')
                 print(f"Charts saved to '{charts_filename}'")
-                
+            
+            if save_figs == 'y' and table_fig is not None:
                 table_filename = input("Enter filename for table (default: shoe_collection_table.png): ").strip()
                 if not table_filename:
                     table_filename = "shoe_collection_table.png"
@@ -474,8 +2036,9 @@ def main():
             df.to_csv("shoe_collection.csv", index=False)
             print("Data saved to 'shoe_collection.csv'")
             
-            charts_fig.savefig("shoe_collection_charts.png", dpi=300, bbox_inches='tight')
-            table_fig.savefig("shoe_collection_table.png", dpi=300, bbox_inches='tight')
+            for figure, figure_filename in [(charts_fig, "shoe_collection_charts.png"), (table_fig, "shoe_collection_table.png")]:
+                if figure is not None:
+                    figure.savefig(figure_filename, dpi=300, bbox_inches='tight')
             print("Figures saved with default filenames.")
     
     print("Thank you for using the Shoe Collection Analyzer!")
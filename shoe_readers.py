@@ -0,0 +1,1317 @@
+import pandas as pd
+from collections import Counter, namedtuple
+import numpy as np
+import sys
+import os
+import io
+import csv
+import mmap
+import gzip
+import bz2
+import lzma
+import hashlib
+import contextlib
+import json
+import re
+import glob
+from array import array
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.feather as pa_feather
+except ImportError:  # pyarrow is optional; columnar parsing falls back to the streaming reader
+    pa = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; only needed for zstd-compressed input
+    zstandard = None
+
+SHOE_FIELDS = ['brand', 'name', 'color', 'usage', 'size']
+VALID_USAGES = ["Casual", "Athletic", "Formal"]
+TEXT_FIELDS = ['brand', 'name', 'color', 'usage']  # Stored as categoricals in every DataFrame
+USAGE_DTYPE = pd.CategoricalDtype(VALID_USAGES)  # Fixed levels, so every DataFrame shares the same usage codes
+DEFAULT_BATCH_SIZE = 100_000  # Records per batch when streaming large files
+LINE_SEPARATOR_SENTINEL = '\x1f'  # Used as the CSV delimiter so the engine returns whole lines; lines containing it are split in Python
+
+# Compressed input is recognized by its leading magic bytes
+COMPRESSION_MAGIC_BYTES = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+]
+MAGIC_BYTES_LENGTH = 6
+
+# On-disk cache of parsed inventories
+DEFAULT_CACHE_DIR = os.environ.get('SHOE_AGG_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'closet_analyzer'))
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_INCREMENTAL_DIR = os.path.join(DEFAULT_CACHE_DIR, 'incremental')  # Kept apart so cache eviction leaves it alone
+CACHE_DIAGNOSTICS_KEY = b'shoe_agg.diagnostics'  # Feather metadata key holding the problem counts of a cache entry
+CACHE_FORMAT_VERSION = 5  # Bump whenever the normalized columns change, to invalidate old entries
+FINGERPRINT_SAMPLE_BYTES = 1024 ** 2
+PARALLEL_CHUNK_BYTES = 64 * 1024 ** 2  # Size of the byte ranges handed to parallel parse workers
+MAX_INCREMENTAL_SEGMENTS = 16  # Appended segments kept per source before they are compacted
+
+# Validation problems counted by ParseDiagnostics, with the reason written to the rejects file
+DIAGNOSTIC_REASONS = {
+    'missing_fields': "fewer than 5 fields; line skipped",
+    'invalid_usage': "invalid usage; defaulted to 'Casual'",
+    'invalid_size': "invalid size; defaulted to 0",
+}
+REJECTS_FLUSH_EVERY = 10_000  # Rejected lines buffered before each write to the rejects file
+
+# Canonical spellings for text values, per field, keyed by canonical_key. Extend with register_aliases
+SHOE_ALIASES = {
+    'brand': {
+        'dr martens': "Dr. Martens",
+        'drmartens': "Dr. Martens",
+        'doc martens': "Dr. Martens",
+        'asics': "ASICS",
+        'ugg': "UGG",
+        'nb': "New Balance",
+    },
+    'name': {},
+    'color': {
+        'grey': "Gray",
+    },
+    'usage': {
+        'casual': "Casual",
+        'athletic': "Athletic",
+        'formal': "Formal",
+        'sport': "Athletic",
+        'dress': "Formal",
+    },
+}
+DISPLAY_CAPITAL = re.compile(r"(?:^|(?<=[\s\-./]))\w")  # Letters canonicalize capitalizes in values without an alias
+CANONICAL_CACHE_MAX = 1_000_000  # Raw spellings remembered per field before the cache is reset
+
+class Shoe(namedtuple('Shoe', SHOE_FIELDS)):
+    """One shoe in a collection.
+    
+    A tuple with named fields: a fraction of the memory of a dict per record,
+    and pandas builds DataFrame columns from it directly.
+    """
+    __slots__ = ()
+
+_canonical_cache = {field: {} for field in SHOE_ALIASES}  # Raw value -> canonical value, per field
+
+def canonical_key(value):
+    """Returns the form raw spellings are matched by: casefolded, without dots and with whitespace collapsed."""
+    return ' '.join(value.replace('.', '').split()).casefold()
+
+def canonicalize(field, value):
+    """Returns the canonical spelling of a raw text value of the given field.
+    
+    The value is looked up in the field's alias table by canonical_key;
+    otherwise it is shown with its whitespace collapsed, lowercased, and
+    capitalized at the start of every word and after '-', '.' or '/'. Case
+    variants such as "NIKE", "nike" and "Nike" thus share one spelling,
+    whichever process or run meets them first, while "Air Max 2.0" keeps
+    its dot and stays apart from "Air Max 20". Results are interned and
+    cached per raw value, so each distinct spelling is normalized only once.
+    """
+    cache = _canonical_cache[field]
+    canonical = cache.get(value)
+    if canonical is None:
+        if len(cache) >= CANONICAL_CACHE_MAX:
+            cache.clear()
+        key = canonical_key(value)
+        canonical = SHOE_ALIASES[field].get(key)
+        if canonical is None:
+            canonical = DISPLAY_CAPITAL.sub(lambda match: match.group().upper(), ' '.join(value.split()).lower())
+        canonical = cache[value] = sys.intern(canonical)
+    return canonical
+
+def register_aliases(field, aliases):
+    """Adds alias spellings for a text field.
+    
+    Args:
+        field: One of TEXT_FIELDS
+        aliases: Mapping of raw spelling to canonical value; raw spellings
+            are matched by canonical_key, so case, dots and spacing do not matter
+    """
+    if field not in SHOE_ALIASES:
+        raise ValueError(f"Unknown field '{field}'. Choose from: {', '.join(SHOE_ALIASES)}")
+    for raw, canonical in aliases.items():
+        if field == 'usage' and canonical not in VALID_USAGES:
+            raise ValueError(f"Usage alias '{raw}' must map to one of: {', '.join(VALID_USAGES)}")
+        SHOE_ALIASES[field][canonical_key(raw)] = canonical
+    _canonical_cache[field].clear()
+
+def _install_aliases(aliases):
+    """Replaces the alias tables, e.g. with a copy taken from the parent process in a worker."""
+    for field, table in aliases.items():
+        SHOE_ALIASES[field] = dict(table)
+        _canonical_cache[field].clear()
+
+def _alias_digest():
+    """Hashes the alias tables, so cached results are not reused after the aliases change."""
+    return hashlib.blake2b(json.dumps(SHOE_ALIASES, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+def load_aliases(filename):
+    """Loads alias spellings from a CSV file with lines of Field,Alias,Canonical.
+    
+    A header line and lines starting with '#' are skipped. Returns True if
+    the file was loaded.
+    """
+    try:
+        with open(filename, newline='') as file:
+            for line_number, row in enumerate(csv.reader(file), start=1):
+                if not row or row[0].strip().startswith('#'):
+                    continue
+                if len(row) < 3:
+                    print(f"Warning: Line {line_number} of '{filename}' needs Field,Alias,Canonical. Skipping.")
+                    continue
+                field, raw, canonical = (value.strip() for value in row[:3])
+                if line_number == 1 and field.lower() == 'field':  # Skip header line
+                    continue
+                register_aliases(field.lower(), {raw: canonical})
+        return True
+    except FileNotFoundError:
+        print(f"Alias file '{filename}' not found.")
+    except ValueError as e:
+        print(f"Invalid alias file '{filename}': {e}")
+    return False
+
+def detect_compression(header):
+    """Returns the compression format ('gzip', 'bz2', 'xz' or 'zstd') named by a file's magic bytes, or None."""
+    for magic, compression in COMPRESSION_MAGIC_BYTES:
+        if header.startswith(magic):
+            return compression
+    return None
+
+def _file_compression(filename):
+    """Returns the compression format of a file on disk, or None if it is plain text."""
+    with open(filename, 'rb') as file:
+        return detect_compression(file.read(MAGIC_BYTES_LENGTH))
+
+def _decompressing_reader(raw, compression):
+    """Wraps a binary stream, or opens a file given its path, so reads return decompressed bytes.
+    
+    A reader opened from a path owns the file and closes it when it is
+    closed; a wrapped stream is left open for its owner to close.
+    """
+    if compression == 'gzip':
+        return gzip.open(raw, 'rb')
+    if compression == 'bz2':
+        return bz2.open(raw, 'rb')
+    if compression == 'xz':
+        return lzma.open(raw, 'rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd-compressed input requires the 'zstandard' package")
+        if isinstance(raw, str):
+            return zstandard.ZstdDecompressor().stream_reader(open(raw, 'rb'), read_across_frames=True, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=False)
+    return open(raw, 'rb') if isinstance(raw, str) else raw
+
+def open_shoe_source(source):
+    """Opens a shoe data source for reading as text, decompressing it on the fly if needed.
+    
+    Compressed input (gzip, bz2, xz or zstd) is recognized by its magic bytes
+    rather than its file extension, so it also works for piped input. Nothing
+    is decompressed to disk. Text is decoded as UTF-8 with undecodable bytes
+    replaced by U+FFFD, as in the columnar and memory-mapped readers.
+    
+    Args:
+        source: Path to a file, or an open binary stream such as sys.stdin.buffer
+    """
+    if isinstance(source, str):
+        # Let the reader own the file, so closing the text stream closes it too
+        return io.TextIOWrapper(_decompressing_reader(source, _file_compression(source)), encoding='utf-8', errors='replace')
+    raw = source if hasattr(source, 'peek') else io.BufferedReader(source)
+    compression = detect_compression(raw.peek(MAGIC_BYTES_LENGTH)[:MAGIC_BYTES_LENGTH])
+    return io.TextIOWrapper(_decompressing_reader(raw, compression), encoding='utf-8', errors='replace')
+
+class ParseDiagnostics:
+    """Collects validation problems found while parsing shoe data.
+    
+    Problems are counted by kind rather than printed one at a time, and a
+    single summary is printed at the end of a read. If rejects_path is set,
+    every affected line is also written there as CSV (source, line number,
+    reason, raw line), buffered and flushed in batches.
+    """
+    
+    def __init__(self, rejects_path=None, source=None, flush_every=REJECTS_FLUSH_EVERY):
+        self.counts = Counter()
+        self.rejects_path = rejects_path
+        self.source = source
+        self.flush_every = flush_every
+        self._pending = []
+        self._file = None
+        self._writer = None
+    
+    def __getstate__(self):
+        # Open files cannot be pickled, so flush before handing this to another process
+        self.close()
+        state = self.__dict__.copy()
+        state['_file'] = None
+        state['_writer'] = None
+        return state
+    
+    @property
+    def keeps_rejects(self):
+        return self.rejects_path is not None
+    
+    def record(self, kind, line_number=None, line=None):
+        """Counts one problem of the given kind, keeping the line if rejects are written."""
+        self.counts[kind] += 1
+        if self.rejects_path is not None:
+            self._pending.append((self.source, line_number, DIAGNOSTIC_REASONS[kind], line))
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+    
+    def record_many(self, kind, line_numbers, lines=None):
+        """Counts several problems of one kind at once, e.g. from a vectorized check."""
+        if not len(line_numbers):  # Leave clean checks out of the counts, so report() stays quiet
+            return
+        if self.rejects_path is None:
+            self.counts[kind] += len(line_numbers)
+            return
+        lines = lines if lines is not None else [None] * len(line_numbers)
+        for line_number, line in zip(line_numbers, lines):
+            self.record(kind, int(line_number), line)
+    
+    def flush(self):
+        """Writes buffered rejects to the rejects file."""
+        if not self._pending:
+            return
+        if self._writer is None:
+            # Append after the first open, so a reused collector keeps earlier rejects
+            is_new = not os.path.exists(self.rejects_path) or os.path.getsize(self.rejects_path) == 0
+            self._file = open(self.rejects_path, 'a', newline='')
+            self._writer = csv.writer(self._file)
+            if is_new:
+                self._writer.writerow(['source', 'line_number', 'reason', 'line'])
+        self._writer.writerows(self._pending)
+        self._pending = []
+    
+    def close(self):
+        """Flushes and closes the rejects file."""
+        if self.rejects_path is not None:
+            self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+    
+    def merge(self, other, line_offset=0):
+        """Adds another collector's counts and rejects to this one.
+        
+        Rejects the other collector wrote to its own file are copied into this
+        collector's file with line_offset added to their line numbers, and the
+        other file is removed.
+        """
+        self.counts.update(other.counts)
+        if other.rejects_path is None or not os.path.exists(other.rejects_path):
+            return
+        if self.rejects_path is not None:
+            with open(other.rejects_path, newline='') as part:
+                reader = csv.reader(part)
+                next(reader, None)  # Skip header
+                for source, line_number, reason, line in reader:
+                    line_number = int(line_number) + line_offset if line_number else None
+                    self._pending.append((source, line_number, reason, line))
+                    if len(self._pending) >= self.flush_every:
+                        self.flush()
+        os.remove(other.rejects_path)
+    
+    def report(self, source_description="the file"):
+        """Closes the rejects file and prints one summary of all problems found."""
+        self.close()
+        if not self.counts:
+            return
+        print(f"Validation summary for {source_description}:")
+        for kind, count in sorted(self.counts.items()):
+            print(f"  {count} line(s): {DIAGNOSTIC_REASONS[kind]}")
+        if self.rejects_path is not None:
+            print(f"  Affected lines written to '{self.rejects_path}'")
+
+def parse_shoe_line(line, diagnostics=None, line_number=None):
+    """Parses one line of a shoe data file into a Shoe record.
+    
+    Returns None for empty lines, comments and lines missing fields.
+    Problems are counted in diagnostics, if one is given.
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):  # Skip empty lines and comments
+        return None
+    
+    parts = line.split(',')
+    if len(parts) < 5:  # Ensure we have all fields: brand, name, color, usage, size
+        if diagnostics is not None:
+            diagnostics.record('missing_fields', line_number, line)
+        return None
+    
+    brand = canonicalize('brand', parts[0])
+    name = canonicalize('name', parts[1])
+    color = canonicalize('color', parts[2])
+    usage = canonicalize('usage', parts[3])
+    
+    # Validate usage
+    if usage not in VALID_USAGES:
+        if diagnostics is not None:
+            diagnostics.record('invalid_usage', line_number, line)
+        usage = "Casual"
+    
+    try:
+        size = float(parts[4].strip())
+    except ValueError:
+        if diagnostics is not None:
+            diagnostics.record('invalid_size', line_number, line)
+        size = 0
+    
+    return Shoe(brand, name, color, usage, size)
+
+def iter_shoe_records(lines, skip_header=True, diagnostics=None, first_line_number=1):
+    """Yields shoe records one at a time from an iterable of lines.
+    
+    Args:
+        lines: Any iterable of text lines, e.g. an open file
+        skip_header: If True, the first line is treated as the header row
+        diagnostics: Optional ParseDiagnostics collecting validation problems
+        first_line_number: Line number of the first line, used in diagnostics
+    """
+    for line_number, line in enumerate(lines, start=first_line_number):
+        if skip_header:
+            skip_header = False
+            continue
+        shoe = parse_shoe_line(line, diagnostics, line_number)
+        if shoe is not None:
+            yield shoe
+
+def iter_shoe_batches(shoes, batch_size=DEFAULT_BATCH_SIZE):
+    """Groups an iterable of shoe records into lists of at most batch_size."""
+    batch = []
+    for shoe in shoes:
+        batch.append(shoe)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def read_shoe_data_from_file(filename, diagnostics=None):
+    """Reads shoe data from a text file."""
+    diagnostics = diagnostics if diagnostics is not None else ParseDiagnostics()
+    diagnostics.source = filename
+    try:
+        with open_shoe_source(filename) as file:
+            shoes = list(iter_shoe_records(file, diagnostics=diagnostics))
+            diagnostics.report(f"'{filename}'")
+            
+            if not shoes:
+                print("No valid data found in the file.")
+                return None
+            
+            return shoes
+    
+    except FileNotFoundError:
+        print(f"File '{filename}' not found.")
+        return None
+    except Exception as e:
+        print(f"An error occurred while reading the file: {e}")
+        return None
+
+def read_shoe_dataframe_from_stream(stream, batch_size=DEFAULT_BATCH_SIZE, diagnostics=None):
+    """Streams shoe data from an open text stream (a file or sys.stdin) into a DataFrame.
+    
+    Records are parsed one line at a time and converted in batches, so only
+    one batch of records is held in memory besides the DataFrame itself.
+    Parsing starts with the first line and never needs the stream to be seekable.
+    """
+    return create_dataframe(iter_shoe_records(stream, diagnostics=diagnostics), batch_size=batch_size)
+
+def read_shoe_dataframe_from_file(filename, batch_size=DEFAULT_BATCH_SIZE, diagnostics=None):
+    """Streams shoe data from a text file straight into a DataFrame."""
+    diagnostics = diagnostics if diagnostics is not None else ParseDiagnostics()
+    diagnostics.source = filename
+    try:
+        with open_shoe_source(filename) as file:
+            df = read_shoe_dataframe_from_stream(file, batch_size=batch_size, diagnostics=diagnostics)
+    except FileNotFoundError:
+        print(f"File '{filename}' not found.")
+        return None
+    except Exception as e:
+        print(f"An error occurred while reading the file: {e}")
+        return None
+    finally:
+        diagnostics.report(f"'{filename}'")
+    
+    if df.empty:
+        print("No valid data found in the file.")
+        return None
+    
+    return df
+
+def _read_raw_lines(source, skip_header=True, use_threads=True):
+    """Reads the data lines of shoe data as one Arrow string column.
+    
+    Empty lines are kept, so row i of the result is line i + 2 of the file
+    (or line i + 1 when there is no header).
+    
+    Args:
+        source: Path to a shoe data file (possibly compressed), or the raw bytes of one
+        skip_header: If True, the first line is treated as the header row
+        use_threads: Let pyarrow parse blocks on multiple threads
+    """
+    data = source
+    if isinstance(source, bytes):
+        size = len(source)
+        source = pa.BufferReader(source)
+    else:
+        size = os.path.getsize(source)
+        compression = _file_compression(source)
+        if compression is not None:
+            # Prefer Arrow's native codecs and fall back to Python's decompressors
+            if compression != 'xz' and pa.Codec.is_available(compression):
+                source = pa.CompressedInputStream(source, compression)
+            else:
+                source = _decompressing_reader(source, compression)
+    if size == 0:
+        return pa.chunked_array([], type=pa.string())
+    
+    try:
+        # Close the stream opened above once parsed; a plain path is opened and closed by pyarrow itself
+        with source if not isinstance(source, str) else contextlib.nullcontext():
+            table = pa_csv.read_csv(
+                source,
+                read_options=pa_csv.ReadOptions(skip_rows=1 if skip_header else 0, column_names=['line'], use_threads=use_threads),
+                parse_options=pa_csv.ParseOptions(delimiter=LINE_SEPARATOR_SENTINEL, quote_char=False, ignore_empty_lines=False),
+                convert_options=pa_csv.ConvertOptions(column_types={'line': pa.string()})
+            )
+    except pa.ArrowInvalid as e:
+        # A lone header line without a trailing newline, or empty decompressed input, has no data rows
+        if 'Could not skip initial' in str(e) or 'Empty CSV file' in str(e):
+            return pa.chunked_array([], type=pa.string())
+        # A line containing the sentinel, or invalid UTF-8, cannot go through the CSV engine
+        if not isinstance(data, bytes):
+            with _decompressing_reader(data, _file_compression(data)) as file:
+                data = file.read()
+        return _split_raw_lines(data, skip_header)
+    return table['line']
+
+def _split_raw_lines(data, skip_header=True):
+    """Splits raw shoe data into lines in Python, for input the CSV engine cannot split.
+    
+    Lines end at LF, CRLF or CR, as in the CSV engine, and undecodable
+    bytes are replaced rather than failing the whole read.
+    """
+    lines = re.split(r'\r\n|\r|\n', data.decode('utf-8', errors='replace'))
+    if lines[-1] == '':
+        lines.pop()
+    return pa.chunked_array([pa.array(lines[1 if skip_header else 0:], type=pa.string())])
+
+def _normalize_dictionary(encoded, normalize):
+    """Applies normalize to each distinct value of a dictionary-encoded column.
+    
+    Returns the per-row values as a pandas Categorical, computed with one call
+    per distinct value rather than one per row. Raw values that normalize to
+    the same string share one category.
+    """
+    remap, categories = pd.factorize(np.array([normalize(value) for value in encoded.dictionary.to_pylist()], dtype=object))
+    return _sorted_categorical(remap[encoded.indices.to_numpy()], categories)
+
+def _normalize_usage(value):
+    """Normalizes a raw usage value, defaulting invalid ones to 'Casual'."""
+    usage = canonicalize('usage', value)
+    return usage if usage in VALID_USAGES else "Casual"
+
+def _record_column_problems(diagnostics, problems, raw_lines, first_line_number):
+    """Records problems found by vectorized checks, in line order.
+    
+    Args:
+        diagnostics: ParseDiagnostics to record them in
+        problems: List of (kind, row positions in raw_lines), one per check
+        raw_lines: The raw lines the positions refer to
+        first_line_number: Line number of the first raw line
+    """
+    if not diagnostics.keeps_rejects:
+        for kind, positions in problems:
+            diagnostics.record_many(kind, positions)
+        return
+    # The checks run one kind at a time; merge them so rejects are written in line order, as the streaming reader does
+    kinds = [kind for kind, positions in problems for _ in range(len(positions))]
+    positions = np.concatenate([positions for _, positions in problems] or [np.zeros(0, dtype=np.int64)])
+    order = np.argsort(positions, kind='stable')
+    # Only look up the raw text when it is actually going to be written out
+    lines = pc.take(raw_lines, pa.array(positions[order])).to_pylist() if len(order) else []
+    for i, line in zip(order, lines):
+        diagnostics.record(kinds[i], int(positions[i]) + first_line_number, line.strip())
+
+def normalize_shoe_columns(lines, diagnostics=None, first_line_number=2, columns=None):
+    """Turns a column of raw data lines into a normalized shoe DataFrame.
+    
+    This applies the same rules as parse_shoe_line, but as whole-column
+    operations instead of one Python call per row.
+    
+    Args:
+        lines: Arrow string array with one file line per row
+        diagnostics: Optional ParseDiagnostics collecting validation problems
+        first_line_number: Line number of the first row, used in diagnostics
+        columns: Shoe fields to decode (default: all). Other fields are
+            neither decoded nor validated.
+    """
+    columns = SHOE_FIELDS if columns is None else columns
+    diagnostics = diagnostics if diagnostics is not None else ParseDiagnostics()
+    raw_lines = lines
+    lines = pc.utf8_trim_whitespace(lines)
+    keep = pc.and_(pc.not_equal(lines, ''), pc.invert(pc.starts_with(lines, '#')))  # Skip empty lines and comments
+    lines = pc.filter(lines, keep)
+    positions = np.flatnonzero(np.asarray(keep, dtype=bool))
+    
+    # Split off at most 6 parts: the 5 fields plus any trailing extras, which are ignored
+    parts = pc.split_pattern(lines, ',', max_splits=5)
+    complete = np.asarray(pc.greater_equal(pc.list_value_length(parts), 5), dtype=bool)  # Ensure we have all fields
+    problems = [('missing_fields', positions[~complete])]
+    parts = pc.filter(parts, pa.array(complete))
+    positions = positions[complete]
+    fields = {field: pc.list_element(parts, i).combine_chunks().dictionary_encode()
+              for i, field in enumerate(SHOE_FIELDS) if field in columns}
+    
+    df = pd.DataFrame(index=pd.RangeIndex(len(parts)))
+    for field in ['brand', 'name', 'color']:
+        if field in fields:
+            df[field] = _normalize_dictionary(fields[field], partial(canonicalize, field))
+    
+    # Validate usage
+    if 'usage' in fields:
+        usage = fields['usage']
+        invalid_usages = np.array([canonicalize('usage', value) not in VALID_USAGES for value in usage.dictionary.to_pylist()], dtype=bool)
+        invalid_usage_rows = invalid_usages[usage.indices.to_numpy()] if len(invalid_usages) else np.zeros(0, dtype=bool)
+        problems.append(('invalid_usage', positions[invalid_usage_rows]))
+        df['usage'] = _normalize_dictionary(usage, _normalize_usage)
+    
+    # Sizes repeat heavily, so parse each distinct size string once and map back to the rows
+    if 'size' in fields:
+        size = fields['size']
+        size_values = size.dictionary.to_pylist()
+        parsed_sizes = np.zeros(len(size_values), dtype=float)
+        invalid_sizes = np.zeros(len(size_values), dtype=bool)
+        for i, value in enumerate(size_values):
+            try:
+                parsed_sizes[i] = float(value.strip())  # float(), as parse_shoe_line uses, so the readers agree
+            except ValueError:
+                invalid_sizes[i] = True
+        size_indices = size.indices.to_numpy()
+        if invalid_sizes.any():
+            problems.append(('invalid_size', positions[invalid_sizes[size_indices]]))
+        df['size'] = parsed_sizes.astype(np.float32)[size_indices]
+    
+    _record_column_problems(diagnostics, problems, raw_lines, first_line_number)
+    return encode_shoe_columns(df[[field for field in SHOE_FIELDS if field in df]])
+
+def read_shoe_columns_from_file(filename, diagnostics=None, columns=None):
+    """Reads shoe data from a text file using a column-at-a-time parser.
+    
+    The file is read by pyarrow's multithreaded CSV engine as whole lines,
+    then split and normalized with vectorized Arrow compute kernels. The
+    result matches read_shoe_dataframe_from_file row for row. Falls back to
+    the streaming reader when pyarrow is not installed.
+    
+    Args:
+        filename: Path to the shoe data file
+        diagnostics: Optional ParseDiagnostics collecting validation problems
+        columns: Shoe fields to decode (default: all)
+    """
+    if pa is None:
+        df = read_shoe_dataframe_from_file(filename, diagnostics=diagnostics)
+        return df if df is None or columns is None else df[[field for field in SHOE_FIELDS if field in columns]]
+    
+    diagnostics = diagnostics if diagnostics is not None else ParseDiagnostics()
+    diagnostics.source = filename
+    try:
+        df = normalize_shoe_columns(_read_raw_lines(filename), diagnostics, columns=columns)
+    except FileNotFoundError:
+        print(f"File '{filename}' not found.")
+        return None
+    except Exception as e:
+        print(f"An error occurred while reading the file: {e}")
+        return None
+    finally:
+        diagnostics.report(f"'{filename}'")
+    
+    if df.empty:
+        print("No valid data found in the file.")
+        return None
+    
+    return df
+
+def _tokenize_shoe_lines(lines, diagnostics, columns=None):
+    """Parses raw byte lines into an encoded shoe DataFrame, dictionary-encoding each field.
+    
+    Each column keeps a dictionary from raw field bytes to a code, so a value
+    is decoded, normalized and validated only the first time it is seen.
+    Raw spellings that normalize to the same value share one code. Fields
+    not in columns (default: all) are skipped entirely.
+    """
+    columns = SHOE_FIELDS if columns is None else columns
+    keep_brand, keep_name, keep_color, keep_usage = (field in columns for field in TEXT_FIELDS)
+    keep_size = 'size' in columns
+    row_count = 0
+    lookups = [{} for _ in TEXT_FIELDS]  # Raw bytes -> code, per column
+    values = [[] for _ in TEXT_FIELDS]  # Code -> normalized string, per column
+    value_codes = [{} for _ in TEXT_FIELDS]  # Normalized string -> code, per column
+    codes = [array('q') for _ in TEXT_FIELDS]
+    brand_get, name_get, color_get, usage_get = (lookup.get for lookup in lookups)
+    brand_append, name_append, color_append, usage_append = (column.append for column in codes)
+    invalid_usages = set()
+    size_lookup = {}
+    invalid_size = object()  # Cached for sizes that fail to parse, so each such row is still counted
+    sizes = array('d')
+    
+    def encode(column, raw):
+        value = canonicalize(TEXT_FIELDS[column], raw.decode('utf-8', errors='replace'))
+        if column == 3 and value not in VALID_USAGES:
+            invalid_usages.add(raw)
+            value = "Casual"
+        code = value_codes[column].get(value)
+        if code is None:
+            code = value_codes[column][value] = len(values[column])
+            values[column].append(value)
+        lookups[column][raw] = code
+        return code
+    
+    for line_number, line in enumerate(lines, start=1):
+        if line_number == 1:  # Skip header line
+            continue
+        
+        parts = line.split(b',', 5)
+        if len(parts) < 5:  # Ensure we have all fields: brand, name, color, usage, size
+            stripped = line.strip()
+            if stripped and not stripped.startswith(b'#'):  # Empty lines and comments are skipped quietly
+                diagnostics.record('missing_fields', line_number, stripped.decode('utf-8', errors='replace'))
+            continue
+        if b'#' in parts[0] and parts[0].lstrip().startswith(b'#'):  # Skip comments
+            continue
+        
+        # Unrolled per column: this loop runs once per row and dominates the parse time
+        row_count += 1
+        if keep_brand:
+            code = brand_get(parts[0])
+            brand_append(code if code is not None else encode(0, parts[0]))
+        if keep_name:
+            code = name_get(parts[1])
+            name_append(code if code is not None else encode(1, parts[1]))
+        if keep_color:
+            code = color_get(parts[2])
+            color_append(code if code is not None else encode(2, parts[2]))
+        if keep_usage:
+            code = usage_get(parts[3])
+            usage_append(code if code is not None else encode(3, parts[3]))
+            
+            # Validate usage
+            if parts[3] in invalid_usages:
+                diagnostics.record('invalid_usage', line_number, line.strip().decode('utf-8', errors='replace'))
+        
+        if keep_size:
+            raw_size = parts[4]
+            size = size_lookup.get(raw_size)
+            if size is None:
+                try:
+                    size = float(raw_size.strip())
+                except ValueError:
+                    size = invalid_size
+                size_lookup[raw_size] = size
+            if size is invalid_size:
+                diagnostics.record('invalid_size', line_number, line.strip().decode('utf-8', errors='replace'))
+                size = 0.0
+            sizes.append(size)
+    
+    # The codes are only renumbered to sorted categories, with no second pass over the raw fields
+    frame = {field: _sorted_categorical(np.frombuffer(codes[i], dtype=np.int64), values[i])
+             for i, field in enumerate(TEXT_FIELDS) if field in columns}
+    if keep_size:
+        frame['size'] = np.frombuffer(sizes, dtype=np.float64)
+    return encode_shoe_columns(pd.DataFrame(frame, index=pd.RangeIndex(row_count)))
+
+def read_shoe_columns_mmap(filename, diagnostics=None, columns=None):
+    """Reads shoe data from a large local file by memory-mapping it.
+    
+    Lines are split as bytes straight out of the mapped buffer and every
+    field is looked up in a per-column dictionary of raw values already seen.
+    Brands, colors, usages and sizes repeat heavily, so almost every field is
+    a dictionary hit and no per-line str is ever created. The result matches
+    read_shoe_dataframe_from_file row for row. Compressed files cannot be
+    mapped and are read with the columnar reader instead.
+    
+    Args:
+        filename: Path to the shoe data file
+        diagnostics: Optional ParseDiagnostics collecting validation problems
+        columns: Shoe fields to decode (default: all)
+    """
+    diagnostics = diagnostics if diagnostics is not None else ParseDiagnostics()
+    diagnostics.source = filename
+    try:
+        if _file_compression(filename) is not None:
+            return read_shoe_columns_from_file(filename, diagnostics=diagnostics, columns=columns)
+        
+        with open(filename, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:  # Empty files cannot be mapped
+                df = _tokenize_shoe_lines([], diagnostics, columns)
+            else:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    df = _tokenize_shoe_lines(iter(buffer.readline, b''), diagnostics, columns)
+    except FileNotFoundError:
+        print(f"File '{filename}' not found.")
+        return None
+    except Exception as e:
+        print(f"An error occurred while reading the file: {e}")
+        return None
+    
+    diagnostics.report(f"'{filename}'")
+    if df.empty:
+        print("No valid data found in the file.")
+        return None
+    
+    return df
+
+def _split_byte_ranges(filename, target_bytes):
+    """Splits a file into byte ranges of roughly target_bytes that start and end on line boundaries."""
+    size = os.path.getsize(filename)
+    boundaries = [0]
+    with open(filename, 'rb') as file:
+        position = target_bytes
+        while position < size:
+            file.seek(position)
+            file.readline()  # Move forward to the start of the next line
+            boundary = file.tell()
+            if boundary >= size:
+                break
+            boundaries.append(boundary)
+            position = boundary + target_bytes
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def _parse_shoe_byte_range(filename, start, end, rejects_path=None, aliases=None):
+    """Parses and normalizes the lines in one byte range of a shoe data file.
+    
+    Returns the DataFrame, the range's ParseDiagnostics (with line numbers
+    relative to the range) and the number of lines in the range.
+    """
+    if aliases is not None:
+        _install_aliases(aliases)
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    diagnostics = ParseDiagnostics(rejects_path, source=filename)
+    # Each worker is one process, so keep pyarrow from spawning threads on top of it
+    lines = _read_raw_lines(data, skip_header=start == 0, use_threads=False)
+    df = normalize_shoe_columns(lines, diagnostics, first_line_number=2 if start == 0 else 1)
+    diagnostics.close()
+    return df, diagnostics, data.count(b'\n')
+
+def read_shoe_columns_parallel(filename, workers=None, chunk_bytes=PARALLEL_CHUNK_BYTES, diagnostics=None):
+    """Reads a large shoe data file by parsing newline-aligned byte ranges in a process pool.
+    
+    Every range goes through the same normalization as
+    read_shoe_columns_from_file, and the per-range columns are concatenated
+    in file order, so the result is identical to a single-process parse.
+    
+    Args:
+        filename: Path to the shoe data file
+        workers: Number of worker processes (defaults to the number of CPUs)
+        chunk_bytes: Approximate size of each byte range handed to a worker
+        diagnostics: Optional ParseDiagnostics collecting validation problems
+    """
+    if pa is None:
+        return read_shoe_columns_from_file(filename, diagnostics=diagnostics)
+    
+    diagnostics = diagnostics if diagnostics is not None else ParseDiagnostics()
+    try:
+        ranges = _split_byte_ranges(filename, chunk_bytes)
+        # Byte offsets into compressed data do not map to lines, so parse those in one pass
+        if len(ranges) <= 1 or _file_compression(filename) is not None:
+            return read_shoe_columns_from_file(filename, diagnostics=diagnostics)
+        
+        starts, ends = zip(*ranges)
+        # Each worker writes its rejects to its own part file, merged below in file order
+        part_paths = [f"{diagnostics.rejects_path}.part-{i}" if diagnostics.keeps_rejects else None
+                      for i in range(len(ranges))]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_parse_shoe_byte_range, [filename] * len(ranges), starts, ends, part_paths,
+                                        [SHOE_ALIASES] * len(ranges)))
+        
+        line_offset = 0
+        for _, range_diagnostics, line_count in results:
+            diagnostics.merge(range_diagnostics, line_offset)
+            line_offset += line_count
+        df = concat_shoe_frames([frame for frame, _, _ in results])
+    except FileNotFoundError:
+        print(f"File '{filename}' not found.")
+        return None
+    except Exception as e:
+        print(f"An error occurred while reading the file: {e}")
+        return None
+    
+    diagnostics.report(f"'{filename}'")
+    if df.empty:
+        print("No valid data found in the file.")
+        return None
+    
+    return df
+
+def _expand_shoe_sources(pattern):
+    """Lists the files to read for a batch: every file in a directory, or every glob match."""
+    if os.path.isdir(pattern):
+        paths = [entry.path for entry in os.scandir(pattern) if entry.is_file()]
+    else:
+        paths = [path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)]
+    return sorted(paths)
+
+def _parse_shoe_source(path, rejects_path=None, aliases=None):
+    """Parses one file of a batch, returning (path, DataFrame, ParseDiagnostics, error message)."""
+    if aliases is not None:
+        _install_aliases(aliases)
+    diagnostics = ParseDiagnostics(rejects_path, source=path)
+    try:
+        if pa is not None:
+            df = normalize_shoe_columns(_read_raw_lines(path, use_threads=False), diagnostics)
+        else:
+            with open_shoe_source(path) as file:
+                df = read_shoe_dataframe_from_stream(file, diagnostics=diagnostics)
+        return path, df, diagnostics, None
+    except Exception as e:
+        return path, None, diagnostics, str(e)
+    finally:
+        diagnostics.close()
+
+def _run_shoe_batch(paths, task, workers, diagnostics):
+    """Runs task(path, rejects_path, aliases) for every path in a process pool.
+    
+    Failures are reported and skipped, progress is printed as files
+    complete, and the per-file diagnostics are merged into diagnostics in
+    path order. Returns a dict of the non-empty results keyed by path.
+    """
+    results = {}
+    source_diagnostics = {}
+    failures = []
+    progress_interval = max(1, len(paths) // 20)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(task, path,
+                                   f"{diagnostics.rejects_path}.part-{i}" if diagnostics.keeps_rejects else None,
+                                   SHOE_ALIASES)
+                   for i, path in enumerate(paths)]
+        for done, future in enumerate(as_completed(futures), start=1):
+            path, result, file_diagnostics, error = future.result()
+            source_diagnostics[path] = file_diagnostics
+            if error is not None:
+                failures.append(path)
+                print(f"Warning: Skipping '{path}': {error}")
+            elif len(result):
+                results[path] = result
+            if done % progress_interval == 0 or done == len(paths):
+                print(f"Read {done}/{len(paths)} files...")
+    
+    # Merge per-file diagnostics in path order so the rejects file is deterministic
+    for path in paths:
+        diagnostics.merge(source_diagnostics[path])
+    
+    if failures:
+        print(f"{len(failures)} of {len(paths)} files could not be read.")
+    return results
+
+def read_shoe_data_batch(pattern, workers=None, per_source=False, diagnostics=None):
+    """Reads many shoe data files concurrently in a process pool.
+    
+    A file that cannot be read is reported and skipped, so one bad file does
+    not fail the whole batch. Progress is printed as files complete.
+    
+    Args:
+        pattern: A directory (all files in it are read) or a glob pattern
+        workers: Number of worker processes (defaults to the number of CPUs)
+        per_source: If True, return a dict of DataFrames keyed by file path
+            instead of one combined DataFrame with a 'source' column
+        diagnostics: Optional ParseDiagnostics collecting validation problems
+    """
+    paths = _expand_shoe_sources(pattern)
+    if not paths:
+        print(f"No files found for '{pattern}'.")
+        return None
+    
+    diagnostics = diagnostics if diagnostics is not None else ParseDiagnostics()
+    results = _run_shoe_batch(paths, _parse_shoe_source, workers, diagnostics)
+    diagnostics.report(f"'{pattern}'")
+    if not results:
+        print("No valid data found in the batch.")
+        return None
+    
+    if per_source:
+        return {path: results[path] for path in paths if path in results}
+    
+    # Tag each row with its source file, stored once per file as a categorical
+    sources = [path for path in paths if path in results]
+    frames = [results[path] for path in sources]
+    df = concat_shoe_frames(frames)
+    df['source'] = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(sources)), [len(frame) for frame in frames]), categories=sources
+    )
+    return df
+
+def _path_digest(filename):
+    """Returns a short, filesystem-safe digest of a file's absolute path."""
+    return hashlib.blake2b(os.path.abspath(filename).encode(), digest_size=8).hexdigest()
+
+def _cache_key(filename):
+    """Builds a cache key from the file's path, size, mtime and a hash of its content.
+    
+    Only the first and last FINGERPRINT_SAMPLE_BYTES are hashed, so the key
+    is cheap to compute even for multi-gigabyte files.
+    """
+    stat = os.stat(filename)
+    path_digest = _path_digest(filename)
+    
+    content_digest = hashlib.blake2b(digest_size=16)
+    content_digest.update(f"{CACHE_FORMAT_VERSION}|{_alias_digest()}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    with open(filename, 'rb') as file:
+        content_digest.update(file.read(FINGERPRINT_SAMPLE_BYTES))
+        if stat.st_size > FINGERPRINT_SAMPLE_BYTES:
+            file.seek(max(FINGERPRINT_SAMPLE_BYTES, stat.st_size - FINGERPRINT_SAMPLE_BYTES))
+            content_digest.update(file.read())
+    
+    return path_digest, content_digest.hexdigest()
+
+def _evict_cache_entries(cache_dir, max_cache_bytes):
+    """Removes the least recently used cache entries until the cache fits in max_cache_bytes."""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.feather'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_cache_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def read_shoe_columns_cached(filename, cache_dir=DEFAULT_CACHE_DIR, max_cache_bytes=DEFAULT_CACHE_MAX_BYTES, diagnostics=None,
+                             workers=None):
+    """Reads shoe data through an on-disk cache of the parsed columns.
+    
+    The normalized columns are stored as uncompressed Feather files, which
+    are memory-mapped on load. An entry is reused only while the source
+    file's size, mtime and content fingerprint are unchanged; otherwise the
+    file is parsed again, in parallel once it spans several
+    PARALLEL_CHUNK_BYTES ranges, and the stale entry replaced. Least
+    recently used entries are evicted once the cache grows beyond
+    max_cache_bytes.
+    
+    Each entry stores the counts of the validation problems found when it
+    was parsed, so a cache hit reports the same summary. The rejected lines
+    themselves are not stored: when diagnostics keeps rejects, the file is
+    always parsed again.
+    
+    Args:
+        filename: Path to the shoe data file
+        cache_dir: Directory holding the cache entries
+        max_cache_bytes: Size limit for the whole cache directory
+        diagnostics: Optional ParseDiagnostics collecting validation problems
+        workers: Number of processes parsing a large file (defaults to the number of CPUs)
+    """
+    if pa is None:
+        return read_shoe_columns_from_file(filename, diagnostics=diagnostics)
+    diagnostics = diagnostics if diagnostics is not None else ParseDiagnostics()
+    
+    try:
+        path_digest, content_digest = _cache_key(filename)
+    except FileNotFoundError:
+        print(f"File '{filename}' not found.")
+        return None
+    except OSError as e:
+        print(f"An error occurred while reading the file: {e}")
+        return None
+    
+    cache_path = os.path.join(cache_dir, f"{path_digest}-{content_digest}.feather")
+    if os.path.exists(cache_path) and not diagnostics.keeps_rejects:
+        try:
+            table = pa_feather.read_table(cache_path, memory_map=True)
+            df = table.to_pandas()
+            os.utime(cache_path)  # Mark as recently used for LRU eviction
+            diagnostics.counts.update(json.loads(table.schema.metadata.get(CACHE_DIAGNOSTICS_KEY, b'{}')))
+            diagnostics.report(f"'{filename}'")
+            return df
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable cache entry for '{filename}': {e}")
+    
+    counts_before = Counter(diagnostics.counts)
+    df = read_shoe_columns_parallel(filename, workers=workers, diagnostics=diagnostics)
+    if df is None:
+        return None
+    
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Drop entries for older versions of the same file before writing the new one
+        for entry in os.scandir(cache_dir):
+            if entry.name.startswith(f"{path_digest}-"):
+                os.remove(entry.path)
+        
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        problems = json.dumps(dict(diagnostics.counts - counts_before)).encode()
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), CACHE_DIAGNOSTICS_KEY: problems})
+        pa_feather.write_feather(table, temp_path, compression='uncompressed')
+        os.replace(temp_path, cache_path)  # Atomic, so concurrent runs never read a partial entry
+        _evict_cache_entries(cache_dir, max_cache_bytes)
+    except Exception as e:
+        print(f"Warning: Could not write cache entry for '{filename}': {e}")
+    
+    return df
+
+def _iter_terminated_lines(file, progress):
+    """Yields decoded lines from a binary file, stopping at a trailing unterminated line.
+    
+    progress['offset'] and progress['lines'] are advanced past every line
+    yielded, and an unterminated last line (one still being written) is left
+    in progress['tail'].
+    """
+    for line in file:
+        if not line.endswith(b'\n'):
+            progress['tail'] = line.decode('utf-8', errors='replace')
+            return
+        progress['offset'] += len(line)
+        progress['lines'] += 1
+        yield line.decode('utf-8', errors='replace')
+
+def _watermark_digest(file, offset):
+    """Hashes the head of the file and the bytes just before offset.
+    
+    Comparing this against the stored digest detects a source that was
+    rewritten in place rather than appended to.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    head_size = min(offset, FINGERPRINT_SAMPLE_BYTES)
+    file.seek(0)
+    digest.update(file.read(head_size))
+    tail_start = max(head_size, offset - FINGERPRINT_SAMPLE_BYTES)
+    file.seek(tail_start)
+    digest.update(file.read(offset - tail_start))
+    return digest.hexdigest()
+
+def _write_feather_segment(df, path):
+    """Writes shoe rows as a Feather segment with a fixed schema.
+    
+    pandas picks the width of a categorical's codes from its number of
+    categories, so segments are cast to int32 dictionary indices; otherwise
+    a segment with more than 127 brands could not be concatenated with the
+    others.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    schema = pa.schema([pa.field(name, pa.dictionary(pa.int32(), pa.string()) if name in TEXT_FIELDS else pa.float32())
+                        for name in table.column_names])
+    pa_feather.write_feather(table.cast(schema), path, compression='uncompressed')
+
+def _read_feather_segments(paths):
+    """Loads and concatenates Feather segments written by _write_feather_segment into one DataFrame."""
+    tables = [pa_feather.read_table(path, memory_map=True) for path in paths]
+    return encode_shoe_columns(pa.concat_tables(tables).to_pandas() if tables else pd.DataFrame(columns=SHOE_FIELDS))
+
+def read_shoe_data_incrementally(filename, state_dir=DEFAULT_INCREMENTAL_DIR, batch_size=DEFAULT_BATCH_SIZE, diagnostics=None):
+    """Reads an append-only shoe data file, parsing only bytes added since the last run.
+    
+    The rows parsed so far are kept in state_dir as Feather segments together
+    with a watermark: the byte offset of the last complete line, the file's
+    inode and a digest of the bytes before the offset. Each run checks the
+    watermark, parses from the offset onward, and stores the new rows as one
+    more segment. If the file was truncated, replaced or rewritten, the state
+    is discarded and the file is parsed again from the start.
+    
+    A trailing line without a newline is included in the result but not in
+    the stored state, so it is parsed again once the writer completes it.
+    
+    Args:
+        filename: Path to the shoe data file
+        state_dir: Directory holding the watermark and the stored rows
+        batch_size: Number of records converted at a time
+        diagnostics: Optional ParseDiagnostics collecting validation problems
+            in the newly parsed lines
+    """
+    if pa is None:
+        return read_shoe_columns_from_file(filename, diagnostics=diagnostics)
+    
+    diagnostics = diagnostics if diagnostics is not None else ParseDiagnostics()
+    diagnostics.source = filename
+    try:
+        stat = os.stat(filename)
+        if _file_compression(filename) is not None:
+            # Byte offsets into compressed data cannot be resumed from
+            return read_shoe_columns_from_file(filename, diagnostics=diagnostics)
+        
+        path_digest = _path_digest(filename)
+        state_path = os.path.join(state_dir, f"{path_digest}.incremental.json")
+        
+        state = None
+        if os.path.exists(state_path):
+            with open(state_path) as state_file:
+                state = json.load(state_file)
+        
+        with open(filename, 'rb') as file:
+            if state is not None:
+                # Rows parsed by an older format or with other aliases cannot be reused either
+                current = state.get('version') == CACHE_FORMAT_VERSION and state.get('aliases') == _alias_digest()
+                valid = (current
+                         and 'line_count' in state
+                         and state['inode'] == stat.st_ino
+                         and state['offset'] <= stat.st_size
+                         and all(os.path.exists(os.path.join(state_dir, segment)) for segment in state['segments'])
+                         and state['digest'] == _watermark_digest(file, state['offset']))
+                if not valid:
+                    if current:
+                        print(f"'{filename}' was truncated or rewritten since the last run. Rebuilding from scratch.")
+                    else:
+                        print(f"Stored rows for '{filename}' were parsed with other settings. Rebuilding from scratch.")
+                    for segment in state['segments']:
+                        try:
+                            os.remove(os.path.join(state_dir, segment))
+                        except OSError:
+                            pass
+                    state = None
+            
+            if state is None:
+                state = {'version': CACHE_FORMAT_VERSION, 'aliases': _alias_digest(), 'inode': stat.st_ino,
+                         'offset': 0, 'line_count': 0, 'segments': []}
+            
+            # Parse only the bytes past the watermark
+            start_offset = state['offset']
+            progress = {'offset': start_offset, 'lines': state['line_count'], 'tail': None}
+            file.seek(start_offset)
+            new_shoes = iter_shoe_records(_iter_terminated_lines(file, progress), skip_header=start_offset == 0,
+                                          diagnostics=diagnostics, first_line_number=state['line_count'] + 1)
+            new_df = create_dataframe(new_shoes, batch_size=batch_size)
+            
+            # An unterminated last line counts as the header if nothing came before it
+            tail_df = None
+            if progress['tail'] is not None:
+                tail_shoes = iter_shoe_records([progress['tail']], skip_header=progress['offset'] == 0,
+                                               diagnostics=diagnostics, first_line_number=progress['lines'] + 1)
+                tail_df = create_dataframe(list(tail_shoes))
+            diagnostics.report(f"'{filename}'")
+            
+            state['offset'] = progress['offset']
+            state['line_count'] = progress['lines']
+            state['digest'] = _watermark_digest(file, state['offset'])
+    except FileNotFoundError:
+        print(f"File '{filename}' not found.")
+        return None
+    except Exception as e:
+        print(f"An error occurred while reading the file: {e}")
+        return None
+    
+    try:
+        os.makedirs(state_dir, exist_ok=True)
+        if not new_df.empty:
+            segment = f"{path_digest}.incremental.{start_offset}.feather"
+            _write_feather_segment(new_df, os.path.join(state_dir, segment))
+            state['segments'].append(segment)
+        
+        df = _read_feather_segments([os.path.join(state_dir, segment) for segment in state['segments']])
+        
+        # Fold many small appends back into a single segment
+        if len(state['segments']) > MAX_INCREMENTAL_SEGMENTS:
+            segment = f"{path_digest}.incremental.{state['offset']}.compacted.feather"
+            _write_feather_segment(df, os.path.join(state_dir, segment))
+            for old_segment in state['segments']:
+                os.remove(os.path.join(state_dir, old_segment))
+            state['segments'] = [segment]
+        
+        temp_path = f"{state_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(temp_path, state_path)
+    except Exception as e:
+        print(f"Warning: Could not update incremental state for '{filename}': {e}")
+        return read_shoe_columns_from_file(filename, diagnostics=ParseDiagnostics())
+    
+    if tail_df is not None and not tail_df.empty:
+        df = concat_shoe_frames([df, tail_df])
+    
+    if df.empty:
+        print("No valid data found in the file.")
+        return None
+    
+    return df
+
+def _sorted_categorical(codes, values):
+    """Builds a Categorical from codes into a list of distinct values, with the categories sorted.
+    
+    Sorted string categories make every reader, chunk and file encode the
+    same values alike, so their frames combine without recoding surprises.
+    """
+    values = np.asarray(values, dtype=object)
+    order = np.argsort(values, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return pd.Categorical.from_codes(rank[codes], categories=pd.Index(values[order], dtype=str))
+
+def encode_shoe_columns(df):
+    """Converts a shoe DataFrame's columns to compact dtypes, in place.
+    
+    Brand, name and color become categoricals, usage the fixed three-level
+    USAGE_DTYPE, and size float32 (half sizes are exact). Counting and
+    grouping then run on small integer codes instead of Python strings.
+    Columns that are already encoded, or absent, are left as they are.
+    
+    Returns:
+        The same DataFrame, for chaining
+    """
+    for field in ['brand', 'name', 'color']:
+        if field not in df:
+            continue
+        column = df[field]
+        if not isinstance(column.dtype, pd.CategoricalDtype):
+            df[field] = _sorted_categorical(*pd.factorize(column.to_numpy(dtype=object)))
+        elif not column.cat.categories.is_monotonic_increasing:
+            df[field] = column.cat.reorder_categories(sorted(column.cat.categories))
+    # Categorical dtypes compare equal regardless of level order, so check the levels themselves
+    if 'usage' in df:
+        usage = df['usage']
+        if not isinstance(usage.dtype, pd.CategoricalDtype):
+            df['usage'] = usage.astype(USAGE_DTYPE)
+        elif list(usage.cat.categories) != VALID_USAGES:
+            df['usage'] = usage.cat.set_categories(VALID_USAGES)
+    if 'size' in df and df['size'].dtype != np.float32:
+        df['size'] = df['size'].astype(np.float32)
+    return df
+
+def concat_shoe_frames(frames):
+    """Concatenates shoe DataFrames, keeping their columns encoded.
+    
+    pd.concat falls back to object columns when categoricals have different
+    categories, so those are combined with union_categoricals instead.
+    """
+    frames = [encode_shoe_columns(frame) for frame in frames if not frame.empty]
+    if not frames:
+        return encode_shoe_columns(pd.DataFrame(columns=SHOE_FIELDS))
+    columns = {}
+    for field in frames[0].columns:
+        if isinstance(frames[0][field].dtype, pd.CategoricalDtype):
+            # Usage keeps its fixed level order; other categories stay sorted
+            columns[field] = union_categoricals([frame[field] for frame in frames], sort_categories=field != 'usage')
+        else:
+            columns[field] = np.concatenate([frame[field].to_numpy() for frame in frames])
+    return pd.DataFrame(columns)
+
+def create_dataframe(shoes, batch_size=DEFAULT_BATCH_SIZE):
+    """Converts shoe data to pandas DataFrame with encoded columns.
+    
+    Args:
+        shoes: A list of Shoe records, or any iterable/generator of them
+        batch_size: Number of records converted at a time for non-list input
+    """
+    if isinstance(shoes, list):
+        return encode_shoe_columns(pd.DataFrame.from_records(shoes, columns=SHOE_FIELDS))
+    
+    # Build the frame batch by batch so a generator is never fully materialized
+    frames = [encode_shoe_columns(pd.DataFrame.from_records(batch, columns=SHOE_FIELDS))
+              for batch in iter_shoe_batches(shoes, batch_size)]
+    return concat_shoe_frames(frames)
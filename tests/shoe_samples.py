@@ -0,0 +1,21 @@
+"""Sample shoe data shared by the tests."""
+import numpy as np
+
+import shoe_agg
+
+BRANDS = ["Nike", "Adidas", "New Balance", "Vans", "Converse", "ASICS", "Salomon", "Dr. Martens"]
+COLORS = ["Black", "White", "Red", "Blue", "Gray", "Brown"]
+NAMES = ["Air Max", "Samba", "990v5", "Old Skool", "Chuck Taylor"]
+
+
+HALF_SIZES = [size / 2 for size in range(10, 30)]
+ODD_SIZES = [9.8, 10.25, 7.3, 0.1, -3.0, -0.5]  # Sizes off the half-size grid, and negative ones
+
+
+def random_shoes(n, seed=0, brands=BRANDS, sizes=HALF_SIZES):
+    """Builds a random shoe DataFrame of n rows, with sizes drawn from sizes (half sizes from 5 to 14.5 by default)."""
+    rng = np.random.default_rng(seed)
+    shoes = [shoe_agg.Shoe(str(rng.choice(brands)), str(rng.choice(NAMES)), str(rng.choice(COLORS)),
+                           str(rng.choice(shoe_agg.VALID_USAGES)), float(rng.choice(sizes)))
+             for _ in range(n)]
+    return shoe_agg.create_dataframe(shoes)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import shoe_agg
+from shoe_samples import random_shoes
+
+BRANDS = np.asarray([f"Brand {i:02d}" for i in range(40)], dtype=object)
+
+
+def random_part(rng):
+    """Returns exact (counts, usage_counts) of a random part of an inventory with Zipf-like brand frequencies."""
+    weights = 1.0 / np.arange(1, len(BRANDS) + 1) ** rng.uniform(0.5, 1.5)
+    brands = rng.choice(len(BRANDS), size=rng.integers(1, 300), p=weights / weights.sum())
+    usages = rng.integers(0, len(shoe_agg.VALID_USAGES), size=len(brands))
+    usage_counts = np.zeros((len(BRANDS), len(shoe_agg.VALID_USAGES)), dtype=np.int64)
+    np.add.at(usage_counts, (brands, usages), 1)
+    return usage_counts.sum(axis=1), usage_counts
+
+
+def sketch_of(capacity, counts, usage_counts):
+    present = counts > 0
+    return shoe_agg.BrandHeavyHitters.from_counts(capacity, BRANDS[present], counts[present],
+                                                  shoe_agg.VALID_USAGES, usage_counts[present])
+
+
+def assert_bounds(sketch, counts, usage_counts, smallest_capacity):
+    """Checks the Space-Saving guarantees of a sketch against the exact counts."""
+    true_count = dict(zip(BRANDS.tolist(), counts.tolist()))
+    true_usage = dict(zip(BRANDS.tolist(), usage_counts))
+    assert sketch.total == counts.sum()
+    assert len(sketch.values) <= sketch.capacity
+    assert (sketch.errors <= sketch.total / smallest_capacity).all()
+    for brand, count, error, usages in zip(sketch.values, sketch.counts, sketch.errors, sketch.usage_counts):
+        assert true_count[brand] <= count <= true_count[brand] + error
+        assert (usages <= true_usage[brand]).all()
+        assert usages.sum() == count - error
+    for brand in set(true_count) - set(sketch.values.tolist()):
+        assert true_count[brand] <= sketch.floor
+
+
+@pytest.mark.parametrize('trial', range(200))
+def test_merged_sketches_keep_their_bounds(trial):
+    rng = np.random.default_rng(trial)
+    parts = [random_part(rng) for _ in range(rng.integers(2, 8))]
+    # Half the trials share one capacity; the others mix capacities, bounded by the smallest
+    capacities = rng.integers(1, 12, size=len(parts)) if trial % 2 else np.full(len(parts), rng.integers(1, 12))
+    sketches = [sketch_of(int(capacity), *part) for capacity, part in zip(capacities, parts)]
+    order = rng.permutation(len(sketches))
+    merged = sketches[order[0]]
+    for i in order[1:]:
+        merged = merged.merge(sketches[i])
+    assert merged.capacity == capacities.max()
+    assert_bounds(merged, sum(part[0] for part in parts), sum(part[1] for part in parts), capacities.min())
+
+
+def test_sketch_with_room_for_every_brand_is_exact():
+    rng = np.random.default_rng(0)
+    parts = [random_part(rng) for _ in range(4)]
+    merged = sketch_of(len(BRANDS), *parts[0])
+    for part in parts[1:]:
+        merged = merged.merge(sketch_of(len(BRANDS), *part))
+    counts = sum(part[0] for part in parts)
+    assert merged.floor == 0
+    assert not merged.errors.any()
+    assert dict(zip(merged.values.tolist(), merged.counts.tolist())) == {
+        brand: count for brand, count in zip(BRANDS.tolist(), counts.tolist()) if count > 0}
+    assert merged.is_exact_top(5)
+
+
+def test_top_brands_of_a_summary_match_exact_counts():
+    df = random_shoes(400, seed=11)
+    summary = shoe_agg.CollectionSummary.from_table(df, brand_capacity=3)
+    values, counts = summary.most_common('brand', 3)
+    errors = summary.brand_errors(3)
+    expected = df['brand'].value_counts()
+    for brand, count, error in zip(values, counts, errors):
+        assert expected[brand] <= count <= expected[brand] + error
+
+
+def test_to_dict_round_trip():
+    sketch = sketch_of(5, *random_part(np.random.default_rng(1)))
+    restored = shoe_agg.BrandHeavyHitters.from_dict(sketch.to_dict())
+    assert restored.to_dict() == sketch.to_dict()
@@ -0,0 +1,44 @@
+import pytest
+
+import shoe_readers
+
+
+@pytest.mark.parametrize('variants, expected', [
+    (["NIKE", "nike", "Nike", " nIKe "], "Nike"),
+    (["BLACK", "black", "Black"], "Black"),
+    (["allen  edmonds", "ALLEN EDMONDS"], "Allen Edmonds"),
+    (["gel-kayano 27.5", "GEL-KAYANO 27.5"], "Gel-Kayano 27.5"),
+    (["a.p.c.", "A.P.C."], "A.P.C."),
+    (["990V5", "990v5"], "990v5"),
+])
+def test_case_variants_share_one_spelling(variants, expected):
+    assert {shoe_readers.canonicalize('brand', value) for value in variants} == {expected}
+
+
+def test_dots_are_kept_and_keep_values_apart():
+    assert shoe_readers.canonicalize('name', "Air Max 2.0") == "Air Max 2.0"
+    assert shoe_readers.canonicalize('name', "Air Max 20") == "Air Max 20"
+
+
+def test_spelling_does_not_depend_on_what_was_seen_first():
+    first = [shoe_readers.canonicalize('brand', value) for value in ["NIKE", "nike"]]
+    shoe_readers._canonical_cache['brand'].clear()
+    second = [shoe_readers.canonicalize('brand', value) for value in ["nike", "NIKE"]]
+    assert first == second[::-1]
+
+
+def test_aliases_match_regardless_of_case_dots_and_spacing():
+    assert shoe_readers.canonicalize('brand', "DR MARTENS") == "Dr. Martens"
+    assert shoe_readers.canonicalize('brand', "asics") == "ASICS"
+    assert shoe_readers.canonicalize('usage', "SPORT") == "Athletic"
+    assert shoe_readers.canonicalize('color', "grey") == "Gray"
+
+
+def test_readers_merge_case_variants(tmp_path):
+    path = tmp_path / 'shoes.txt'
+    path.write_text("Brand,Name,Color,Usage,Size\nNIKE,Air Max,BLACK,casual,10\nnike,air max,black,Casual,9\n"
+                    "Nike,Air Max,Black,CASUAL,11\n")
+    for df in (shoe_readers.read_shoe_dataframe_from_file(str(path)), shoe_readers.read_shoe_columns_from_file(str(path))):
+        assert df['brand'].astype(str).tolist() == ["Nike"] * 3
+        assert df['color'].astype(str).tolist() == ["Black"] * 3
+        assert set(df['brand'].cat.categories) == {"Nike"}
@@ -0,0 +1,75 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+import shoe_agg
+from shoe_samples import random_shoes
+
+
+@pytest.fixture(params=['dense', 'sparse'])
+def cube_and_shoes(request, monkeypatch):
+    """A cube over random shoes, stored densely or, with the dense limit lowered, sparsely."""
+    if request.param == 'sparse':
+        monkeypatch.setattr(shoe_agg, 'CUBE_DENSE_MAX_CELLS', 0)
+    df = random_shoes(600, seed=5)
+    cube = shoe_agg.ShoeCube.from_table(df)
+    assert (cube.cells is None) == (request.param == 'dense')
+    return cube, df
+
+
+def assert_matches_crosstab(result, rows, columns):
+    """Compares a cube crosstab with pd.crosstab of the columns, leaving out values that never occur."""
+    expected = pd.crosstab(rows, columns)
+    expected = expected.loc[expected.sum(axis=1) > 0, expected.sum(axis=0) > 0]
+    assert result.index.tolist() == expected.index.tolist()
+    assert result.columns.tolist() == expected.columns.tolist()
+    assert (result.to_numpy() == expected.to_numpy()).all()
+
+
+def plain(df, fields):
+    """The columns of a shoe DataFrame as plain values, so pandas does not list unused categories."""
+    return {field: df[field].astype(float if field == 'size' else object) for field in fields}
+
+
+@pytest.mark.parametrize('row_field, column_field', list(itertools.combinations(shoe_agg.CUBE_FIELDS, 2)))
+def test_crosstab_matches_pandas(cube_and_shoes, row_field, column_field):
+    cube, df = cube_and_shoes
+    assert_matches_crosstab(cube.crosstab(row_field, column_field), df[row_field], df[column_field])
+
+
+def test_restricted_crosstab_matches_pandas_on_matching_rows(cube_and_shoes):
+    cube, df = cube_and_shoes
+    rows = df[(df['color'] == 'Black') & df['usage'].isin(['Casual', 'Formal'])]
+    result = cube.crosstab('brand', 'size', color='Black', usage=['Casual', 'Formal'])
+    assert_matches_crosstab(result, rows['brand'], rows['size'])
+
+
+def test_value_counts_match_groupby(cube_and_shoes):
+    cube, df = cube_and_shoes
+    fields = ['brand', 'color', 'usage']
+    expected = pd.DataFrame(plain(df, fields)).value_counts()
+    result = cube.value_counts(*fields)
+    assert result.to_dict() == expected.to_dict()
+    assert result.is_monotonic_decreasing
+
+
+def test_total_and_single_field_marginals(cube_and_shoes):
+    cube, df = cube_and_shoes
+    assert cube.total == len(df)
+    for field in shoe_agg.CUBE_FIELDS:
+        (labels,), counts = cube.marginal(field)
+        assert dict(zip(labels.tolist(), counts.tolist())) == plain(df, [field])[field].value_counts().to_dict()
+
+
+def test_unknown_fields_are_rejected(cube_and_shoes):
+    cube, _ = cube_and_shoes
+    with pytest.raises(ValueError):
+        cube.marginal('name')
+    with pytest.raises(ValueError):
+        cube.crosstab('brand', 'color', name='Samba')
+
+
+def test_missing_columns_are_rejected():
+    with pytest.raises(ValueError):
+        shoe_agg.ShoeCube.from_table(random_shoes(10)[['brand', 'color']], fields=['brand', 'size'])
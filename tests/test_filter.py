@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+import shoe_agg
+from shoe_samples import BRANDS, COLORS, HALF_SIZES, ODD_SIZES, random_shoes
+
+
+def random_expression(rng, df, depth=0):
+    """Returns a random filter expression and the pandas mask it should select."""
+    choice = rng.integers(0, 7 if depth < 3 else 4)
+    if choice == 0:
+        brands = list(rng.choice(BRANDS + ["Missing Brand"], size=rng.integers(1, 4), replace=False))
+        text = ', '.join(f'"{brand}"' if rng.integers(2) else brand for brand in brands)
+        if rng.integers(2):
+            return f"brand not in {{{text}}}", ~df['brand'].isin(brands)
+        return f"brand in {{{text}}}", df['brand'].isin(brands)
+    if choice == 1:
+        color = str(rng.choice(COLORS))
+        if rng.integers(2):
+            return f"color != {color}", df['color'] != color
+        return f"color == {color.lower()}", df['color'] == color
+    if choice == 2:
+        usage = str(rng.choice(shoe_agg.VALID_USAGES))
+        return f"usage = {usage}", df['usage'] == usage
+    if choice == 3:
+        operator = str(rng.choice(['<', '<=', '>', '>=', '==', '!=']))
+        size = float(rng.choice(HALF_SIZES + ODD_SIZES + [0.0]))
+        sizes, size = df['size'].to_numpy(), np.float32(size)  # Sizes are stored as float32
+        masks = {'<': sizes < size, '<=': sizes <= size, '>': sizes > size, '>=': sizes >= size,
+                 '==': sizes == size, '!=': sizes != size}
+        return f"size {operator} {size:g}", masks[operator]
+    if choice == 4:
+        text, mask = random_expression(rng, df, depth + 1)
+        return f"not ({text})", ~mask
+    left, left_mask = random_expression(rng, df, depth + 1)
+    right, right_mask = random_expression(rng, df, depth + 1)
+    if choice == 5:
+        return f"({left}) and ({right})", left_mask & right_mask
+    return f"({left}) or ({right})", left_mask | right_mask
+
+
+@pytest.mark.parametrize('sizes', [HALF_SIZES, HALF_SIZES + ODD_SIZES], ids=['half-sizes', 'odd-sizes'])
+@pytest.mark.parametrize('bitmaps', [True, False])
+def test_random_expressions_match_pandas_masks(monkeypatch, bitmaps, sizes):
+    if not bitmaps:
+        monkeypatch.setattr(shoe_agg, 'BITMAP_MAX_VALUES', 0)
+    df = random_shoes(500, seed=9, sizes=sizes)
+    index = shoe_agg.ShoeTable.from_dataframe(df).index()
+    rng = np.random.default_rng(1)
+    for _ in range(300):
+        expression, expected = random_expression(rng, df)
+        assert (index.mask(expression) == np.asarray(expected)).all(), expression
+        assert index.count(expression) == expected.sum()
+
+
+def test_filter_returns_the_matching_rows():
+    df = random_shoes(200, seed=2)
+    expression = "brand in {Nike, New Balance} and usage == Athletic and size >= 10"
+    expected = df[df['brand'].isin(['Nike', 'New Balance']) & (df['usage'] == 'Athletic') & (df['size'] >= 10)]
+    result = shoe_agg.ShoeTable.from_dataframe(df).filter(expression).to_dataframe()
+    assert result.astype(object).values.tolist() == expected.astype(object).values.tolist()
+
+
+def test_sizes_off_the_half_size_grid_compare_exactly():
+    df = shoe_agg.create_dataframe([shoe_agg.Shoe("Nike", "Air Max", "Red", "Casual", size) for size in [9.8, 10.25, 10.0, -3]])
+    index = shoe_agg.ShoeTable.from_dataframe(df).index()
+    assert index.mask("size >= 10").tolist() == [False, True, True, False]
+    assert index.mask("size == 10.25").tolist() == [False, True, False, False]
+    assert index.mask("size == 9.8").tolist() == [True, False, False, False]
+    assert index.mask("size == 0").tolist() == [False, False, False, False]
+    assert index.mask("size < 0").tolist() == [False, False, False, True]
+
+
+def test_and_binds_tighter_than_or():
+    assert shoe_agg.parse_filter("color == Red or color == Blue and size > 9") == (
+        'or', ('==', 'color', 'Red'), ('and', ('==', 'color', 'Blue'), ('>', 'size', 9.0)))
+
+
+def test_values_may_span_words_or_be_quoted():
+    assert shoe_agg.parse_filter("brand == New Balance and name in {'Air Max', Old Skool}") == (
+        'and', ('==', 'brand', 'New Balance'), ('in', 'name', ['Air Max', 'Old Skool']))
+
+
+@pytest.mark.parametrize('expression', [
+    "",
+    "shoe == Nike",
+    "brand > Nike",
+    "size >= ten",
+    "brand in {Nike",
+    "(color == Red",
+    "color == Red)",
+    "brand not == Nike",
+    "color == Red and",
+])
+def test_malformed_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        shoe_agg.parse_filter(expression)
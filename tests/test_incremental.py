@@ -0,0 +1,96 @@
+import os
+
+import shoe_readers
+
+HEADER = "Brand,Name,Color,Usage,Size\n"
+
+
+def shoe_lines(prefix, count):
+    return "".join(f"{prefix}{i},Samba,Red,Casual,9\n" for i in range(count))
+
+
+def test_appending_many_new_categories_keeps_the_state(tmp_path):
+    path = tmp_path / 'shoes.txt'
+    state_dir = str(tmp_path / 'state')
+    path.write_text(HEADER + shoe_lines("Brand A", 10))
+    assert len(shoe_readers.read_shoe_data_incrementally(str(path), state_dir=state_dir)) == 10
+    
+    # More than 127 new brands widens the categorical codes of the appended segment
+    with open(path, 'a') as file:
+        file.write(shoe_lines("Brand B", 300))
+    df = shoe_readers.read_shoe_data_incrementally(str(path), state_dir=state_dir)
+    assert len(df) == 310
+    assert df['brand'].nunique() == 310
+    segments = [name for name in os.listdir(state_dir) if name.endswith('.feather')]
+    assert len(segments) == 2
+    assert len(shoe_readers.read_shoe_data_incrementally(str(path), state_dir=state_dir)) == 310
+
+
+def test_cache_eviction_leaves_incremental_state_alone(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    state_dir = cache_dir / 'incremental'
+    path = tmp_path / 'shoes.txt'
+    path.write_text(HEADER + shoe_lines("Brand ", 20))
+    shoe_readers.read_shoe_data_incrementally(str(path), state_dir=str(state_dir))
+    shoe_readers.read_shoe_columns_cached(str(path), cache_dir=str(cache_dir), max_cache_bytes=0)
+    assert any(name.endswith('.feather') for name in os.listdir(state_dir))
+
+
+def read(path, state_dir, diagnostics=None):
+    df = shoe_readers.read_shoe_data_incrementally(str(path), state_dir=str(state_dir), diagnostics=diagnostics)
+    return df['brand'].astype(str).tolist()
+
+
+def test_appends_parse_only_the_new_lines(tmp_path):
+    path = tmp_path / 'shoes.txt'
+    state_dir = tmp_path / 'state'
+    path.write_text(HEADER + shoe_lines("Brand ", 3) + "Vans,Old Skool,Black,Casual,9")
+    # A last line still being written is read, but parsed again once it is complete
+    assert read(path, state_dir) == ["Brand 0", "Brand 1", "Brand 2", "Vans"]
+    
+    with open(path, 'a') as file:
+        file.write(",extra\nNike,Samba,Red,Bogus,10\n")
+    diagnostics = shoe_readers.ParseDiagnostics(str(tmp_path / 'rejects.csv'))
+    assert read(path, state_dir, diagnostics) == ["Brand 0", "Brand 1", "Brand 2", "Vans", "Nike"]
+    # Only the appended lines were parsed, and problems keep their line numbers in the whole file
+    assert dict(diagnostics.counts) == {'invalid_usage': 1}
+    assert (tmp_path / 'rejects.csv').read_text().splitlines()[1].split(',')[1] == '6'
+    assert read(path, state_dir) == ["Brand 0", "Brand 1", "Brand 2", "Vans", "Nike"]
+
+
+def test_truncated_file_is_parsed_again(tmp_path, capsys):
+    path = tmp_path / 'shoes.txt'
+    state_dir = tmp_path / 'state'
+    path.write_text(HEADER + shoe_lines("Brand ", 10))
+    assert len(read(path, state_dir)) == 10
+    path.write_text(HEADER + shoe_lines("Other ", 2))
+    assert read(path, state_dir) == ["Other 0", "Other 1"]
+    assert "truncated or rewritten" in capsys.readouterr().out
+    assert len([name for name in os.listdir(state_dir) if name.endswith('.feather')]) == 1
+
+
+def test_file_rewritten_in_place_is_parsed_again(tmp_path, capsys):
+    path = tmp_path / 'shoes.txt'
+    state_dir = tmp_path / 'state'
+    path.write_text(HEADER + shoe_lines("Brand ", 3))
+    assert read(path, state_dir) == ["Brand 0", "Brand 1", "Brand 2"]
+    
+    # Same length and inode, different bytes before the watermark, then an append
+    with open(path, 'r+') as file:
+        file.seek(len(HEADER))
+        file.write("Other")
+    with open(path, 'a') as file:
+        file.write(shoe_lines("Added ", 1))
+    assert read(path, state_dir) == ["Other 0", "Brand 1", "Brand 2", "Added 0"]
+    assert "truncated or rewritten" in capsys.readouterr().out
+
+
+def test_replaced_file_is_parsed_again(tmp_path):
+    path = tmp_path / 'shoes.txt'
+    state_dir = tmp_path / 'state'
+    path.write_text(HEADER + shoe_lines("Brand ", 3))
+    assert len(read(path, state_dir)) == 3
+    replacement = tmp_path / 'new.txt'
+    replacement.write_text(HEADER + shoe_lines("Brand ", 3) + shoe_lines("Other ", 1))
+    os.replace(replacement, path)
+    assert read(path, state_dir) == ["Brand 0", "Brand 1", "Brand 2", "Other 0"]
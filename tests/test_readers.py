@@ -0,0 +1,128 @@
+from functools import partial
+
+import pytest
+
+import shoe_agg
+import shoe_readers
+
+READERS = {
+    'streaming': shoe_readers.read_shoe_dataframe_from_file,
+    'columnar': shoe_readers.read_shoe_columns_from_file,
+    'mmap': shoe_readers.read_shoe_columns_mmap,
+}
+
+
+# CRLF line ends, comments, a blank line, extra columns, bad usage and size, a short line and invalid UTF-8
+PARITY_DATA = (b"Brand,Name,Color,Usage,Size\r\n# just a comment\r\n# Nike,Air Max,Red,Casual,10\r\n"
+               b"Nike,Air Max,Red,Casual,10\r\nnike,air max,RED,casual,10.5\r\nVans,Old Skool,Black,Bogus,9\r\n"
+               b"Adidas,Samba,White,Athletic,big\r\nAdidas,Samba,White,Formal,11,extra,columns\r\nshort,line\r\n"
+               b"Puma,Su\xffede,Blue,Casual,8\r\n\r\n  asics , Gel ,grey, Athletic , 12 \r\n")
+
+
+def rows(df):
+    return df[shoe_readers.SHOE_FIELDS].astype(object).values.tolist()
+
+
+def every_reader(tmp_path):
+    """READERS plus the readers that keep state, which is stored under tmp_path."""
+    return {
+        **READERS,
+        'parallel': partial(shoe_readers.read_shoe_columns_parallel, workers=2, chunk_bytes=40),
+        'cached': partial(shoe_readers.read_shoe_columns_cached, cache_dir=str(tmp_path / 'cache')),
+        'incremental': partial(shoe_readers.read_shoe_data_incrementally, state_dir=str(tmp_path / 'state')),
+    }
+
+
+@pytest.mark.parametrize('reader', [*READERS, 'parallel', 'cached', 'incremental'])
+def test_every_reader_parses_the_same_rows_and_problems(tmp_path, reader):
+    path = tmp_path / 'shoes.txt'
+    path.write_bytes(PARITY_DATA)
+    read = every_reader(tmp_path)[reader]
+    rejects = tmp_path / 'rejects.csv'
+    diagnostics = shoe_readers.ParseDiagnostics(str(rejects))
+    df = read(str(path), diagnostics=diagnostics)
+    diagnostics.close()
+    
+    expected = [
+        ["Nike", "Air Max", "Red", "Casual", 10.0],
+        ["Nike", "Air Max", "Red", "Casual", 10.5],
+        ["Vans", "Old Skool", "Black", "Casual", 9.0],
+        ["Adidas", "Samba", "White", "Athletic", 0.0],
+        ["Adidas", "Samba", "White", "Formal", 11.0],
+        ["Puma", "Su\ufffdede", "Blue", "Casual", 8.0],
+        ["ASICS", "Gel", "Gray", "Athletic", 12.0],
+    ]
+    assert rows(df) == expected
+    assert [str(df[field].dtype) for field in shoe_readers.SHOE_FIELDS] == ['category'] * 4 + ['float32']
+    assert dict(diagnostics.counts) == {'missing_fields': 1, 'invalid_usage': 1, 'invalid_size': 1}
+    assert [line.split(',')[1] for line in rejects.read_text().splitlines()[1:]] == ['6', '7', '9']
+    # The cached and incremental readers answer a second read from their stored rows
+    assert rows(read(str(path), diagnostics=shoe_readers.ParseDiagnostics())) == expected
+
+
+@pytest.mark.parametrize('reader', READERS)
+def test_invalid_utf8_is_replaced_by_every_reader(tmp_path, reader):
+    path = tmp_path / 'shoes.txt'
+    path.write_bytes(b"Brand,Name,Color,Usage,Size\nNike,Air \xff Max,Red,Casual,10\nVans,Old Skool,Black,Casual,9\n")
+    assert rows(READERS[reader](str(path))) == [
+        ["Nike", "Air � Max", "Red", "Casual", 10.0],
+        ["Vans", "Old Skool", "Black", "Casual", 9.0],
+    ]
+
+
+def test_cache_hits_report_the_problems_found_when_parsing(tmp_path):
+    path = tmp_path / 'shoes.txt'
+    path.write_text("Brand,Name,Color,Usage,Size\nNike,Samba,Red,Bogus,10\nNike,Samba,Red,Casual,big\nshort,line\n")
+    cache_dir = str(tmp_path / 'cache')
+    counts = []
+    for _ in range(2):
+        diagnostics = shoe_readers.ParseDiagnostics()
+        shoe_readers.read_shoe_columns_cached(str(path), cache_dir=cache_dir, diagnostics=diagnostics)
+        counts.append(dict(diagnostics.counts))
+    assert counts[0] == counts[1] == {'missing_fields': 1, 'invalid_usage': 1, 'invalid_size': 1}
+    
+    # Rejected lines are not cached, so asking for them parses the file again
+    rejects = tmp_path / 'rejects.csv'
+    shoe_readers.read_shoe_columns_cached(str(path), cache_dir=cache_dir, diagnostics=shoe_readers.ParseDiagnostics(str(rejects)))
+    assert len(rejects.read_text().splitlines()) == 4
+
+
+@pytest.mark.parametrize('reader', READERS)
+def test_rejects_are_written_in_line_order(tmp_path, reader):
+    path = tmp_path / 'shoes.txt'
+    path.write_text("Brand,Name,Color,Usage,Size\nNike,Samba,Red,Casual,big\nNike,Samba,Red,Bogus,10\nshort,line\n"
+                    "Vans,Old Skool,Black,Bogus,huge\nVans,Old Skool,Black,Casual,9\nonly one field\n")
+    rejects = tmp_path / 'rejects.csv'
+    diagnostics = shoe_readers.ParseDiagnostics(str(rejects), source='shoes.txt')
+    READERS[reader](str(path), diagnostics=diagnostics)
+    diagnostics.close()
+    lines = rejects.read_text().splitlines()[1:]
+    assert [line.split(',')[1] for line in lines] == ['2', '3', '4', '5', '5', '7']
+    assert lines[3].split(',')[2].startswith('invalid usage') and lines[4].split(',')[2].startswith('invalid size')
+
+
+def test_mmap_reader_decodes_only_the_columns_the_panels_need(tmp_path):
+    path = tmp_path / 'shoes.txt'
+    path.write_text("Brand,Name,Color,Usage,Size\nNike,Air Max,Red,Casual,10\nVans,Old Skool,Black,Athletic,9.5\n")
+    columns = shoe_agg.columns_for_panels(['size_by_color'])
+    df = shoe_readers.read_shoe_columns_mmap(str(path), columns=columns)
+    assert list(df.columns) == ['color', 'size']
+    assert df.astype(object).values.tolist() == [["Red", 10.0], ["Black", 9.5]]
+
+
+def test_panels_option_is_validated():
+    assert shoe_agg.parse_args(['--panels', 'Colors, inventory']).panels == ['colors', 'inventory']
+    for argv in (['--panels', 'colors,shoes'], ['--panels', 'inventory', '--summary-only'],
+                 ['--panels', 'colors', '--crosstab', 'brand,color']):
+        with pytest.raises(SystemExit):
+            shoe_agg.parse_args(argv)
+
+
+@pytest.mark.parametrize('reader', READERS)
+def test_clean_files_report_no_problems(tmp_path, capsys, reader):
+    path = tmp_path / 'shoes.txt'
+    path.write_text("Brand,Name,Color,Usage,Size\nNike,Air Max,Red,Casual,10\n")
+    diagnostics = shoe_readers.ParseDiagnostics()
+    READERS[reader](str(path), diagnostics=diagnostics)
+    assert not diagnostics.counts
+    assert "Validation summary" not in capsys.readouterr().out
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import shoe_agg
+from shoe_samples import HALF_SIZES, ODD_SIZES, random_shoes
+
+
+@pytest.fixture(params=['half-sizes', 'odd-sizes'])
+def shoes(request):
+    sizes = HALF_SIZES if request.param == 'half-sizes' else HALF_SIZES + ODD_SIZES + [400000.0]
+    return random_shoes(400, seed=4, sizes=sizes)
+
+
+def test_size_counts_match_pandas(shoes):
+    sizes, counts = shoe_agg.ShoeTable.from_dataframe(shoes).size_counts()
+    assert dict(zip(sizes.tolist(), counts.tolist())) == shoes['size'].value_counts().to_dict()
+
+
+def test_size_stats_by_color_match_pandas(shoes):
+    stats = shoe_agg.CollectionSummary.from_table(shoes).size_stats_by_color()
+    sizes = shoes['size'].astype(np.float64).groupby(shoes['color'].astype(str))
+    expected = {
+        'count': sizes.count(), 'mean': sizes.mean(), 'min': sizes.min(), 'max': sizes.max(),
+        'q1': sizes.quantile(0.25), 'median': sizes.median(), 'q3': sizes.quantile(0.75),
+    }
+    for name, values in expected.items():
+        np.testing.assert_allclose(stats[name], values.loc[stats['values']].to_numpy(), err_msg=name)
+
+
+def test_cube_keeps_exact_sizes(shoes):
+    (sizes,), counts = shoe_agg.ShoeCube.from_table(shoes).marginal('size')
+    assert dict(zip(sizes.tolist(), counts.tolist())) == shoes['size'].value_counts().to_dict()
+
+
+def test_half_sizes_are_counted_through_their_codes():
+    shoes = shoe_agg.ShoeTable.from_dataframe(random_shoes(50, sizes=HALF_SIZES))
+    sizes, index = shoes.size_index()
+    assert np.array_equal(sizes[index], shoes.sizes)
+    assert np.array_equal(shoe_agg.decode_sizes(shoe_agg.encode_sizes(sizes)), sizes)
+
+
+def test_off_grid_sizes_are_not_snapped():
+    df = shoe_agg.create_dataframe([shoe_agg.Shoe("Nike", "Air Max", "Red", "Casual", size)
+                                    for size in [9.8, 10.25, 10.0, -3.0]])
+    summary = shoe_agg.CollectionSummary.from_table(df)
+    assert summary.size_counts[0].tolist() == pytest.approx([-3.0, 9.8, 10.0, 10.25])
+    assert summary.size_stats_by_color()['mean'][0] == pytest.approx(pd.Series([9.8, 10.25, 10.0, -3.0]).mean())
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import shoe_agg
+from shoe_samples import random_shoes
+
+
+def assert_same_summary(left, right):
+    assert left.total == right.total
+    assert left.columns == right.columns
+    for field in ('brand', 'color', 'usage'):
+        values, counts = left.most_common(field)
+        expected_values, expected_counts = right.most_common(field)
+        assert values.tolist() == expected_values.tolist()
+        assert counts.tolist() == expected_counts.tolist()
+    assert left.size_counts[0].tolist() == right.size_counts[0].tolist()
+    assert left.size_counts[1].tolist() == right.size_counts[1].tolist()
+    for name in ('brand_usage', 'color_sizes'):
+        for part, expected in zip(getattr(left, name), getattr(right, name)):
+            assert part.tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_merge_of_parts_equals_summary_of_whole(seed):
+    df = random_shoes(300, seed=seed)
+    cuts = [0, *sorted(np.random.default_rng(seed).choice(np.arange(1, len(df)), 3, replace=False)), len(df)]
+    parts = [shoe_agg.CollectionSummary.from_table(df.iloc[start:end].reset_index(drop=True))
+             for start, end in zip(cuts, cuts[1:])]
+    assert_same_summary(shoe_agg.merge_summaries(parts), shoe_agg.CollectionSummary.from_table(df))
+
+
+def test_merge_is_order_independent():
+    parts = [shoe_agg.CollectionSummary.from_table(random_shoes(100, seed=seed)) for seed in range(4)]
+    forward = shoe_agg.merge_summaries(parts)
+    assert_same_summary(shoe_agg.merge_summaries(parts[::-1]), forward)
+    assert_same_summary(parts[0].merge(parts[1]).merge(parts[2].merge(parts[3])), forward)
+
+
+def test_counts_match_pandas():
+    df = random_shoes(500, seed=7)
+    summary = shoe_agg.CollectionSummary.from_table(df)
+    for field in ('brand', 'color', 'usage'):
+        values, counts = summary.most_common(field)
+        expected = df[field].value_counts()
+        assert dict(zip(values.tolist(), counts.tolist())) == expected[expected > 0].to_dict()
+    brands, usages, counts = summary.brand_usage
+    expected = pd.crosstab(df['brand'], df['usage']).loc[brands, usages]
+    assert (counts == expected.to_numpy()).all()
+
+
+def test_save_and_load_round_trip(tmp_path):
+    summary = shoe_agg.CollectionSummary.from_table(random_shoes(200, seed=3))
+    path = tmp_path / 'summary.json'
+    shoe_agg.save_summary(summary, str(path))
+    assert_same_summary(shoe_agg.load_summary(str(path)), summary)
+
+
+def test_merge_keeps_only_shared_columns():
+    df = random_shoes(100)
+    full = shoe_agg.CollectionSummary.from_table(df)
+    colors_only = shoe_agg.CollectionSummary.from_table(df[['color']])
+    merged = full.merge(colors_only)
+    assert merged.columns == ['color']
+    assert merged.most_common('color')[1].sum() == 2 * len(df)
+
+
+def test_unsupported_version_is_rejected():
+    with pytest.raises(ValueError):
+        shoe_agg.CollectionSummary.from_dict({'version': shoe_agg.SUMMARY_FORMAT_VERSION + 1})